@@ -131,9 +131,11 @@ LOGGING = {
         "console": {
             "class": "logging.StreamHandler",
         },
+        # The records are written from a background thread, use logging.FileHandler to write them
+        # synchronously instead.
         "file": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            "class": "thewall.logs.QueuedFileHandler",
             "filename": "info.log",
         },
     },
@@ -149,3 +151,56 @@ LOGGING = {
         },
     },
 }
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+# JSON is encoded with orjson when it is installed, with the standard library otherwise.
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "thewall.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+# The "thewall" cache keeps the responses of the read endpoints until the next upload. Use a
+# django.core.cache.backends.filebased.FileBasedCache to share it between processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "thewall": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "thewall",
+    },
+}
+
+# The Wall
+# Number of day rows written per INSERT when saving an upload.
+THEWALL_BULK_BATCH_SIZE = 1000
+# Uploads sent with async=true are processed by this many background threads. Every upload writes its
+# own dataset, the last one to finish becomes the active one.
+THEWALL_UPLOAD_JOB_WORKERS = 1
+# Number of finished upload jobs whose status can still be polled.
+THEWALL_UPLOAD_JOBS_KEPT = 100
+# How the progress of the profiles is stored: "rows" keeps a row per profile and day besides the
+# compact per-profile progress, "compact" keeps only the latter (profiles/raw/ is then empty).
+THEWALL_STORAGE = "rows"
+# Number of upload results kept in memory, so that uploading the same file again is not simulated again.
+THEWALL_RESULT_CACHE_SIZE = 8
+# Maximum number of (profile, day, metric) queries in a request to profiles/batch/.
+THEWALL_BATCH_MAX_QUERIES = 10000
+# Number of processes the profiles of an upload with a crew per section are worked out on, and the
+# number of profiles sent to a process at a time.
+THEWALL_PROCESSES = 1
+THEWALL_PROCESS_CHUNK_SIZE = 100
+# What is logged about the workers of the multi-threaded version each day: "full" logs the job of
+# every worker, "sampled" the job of every THEWALL_WORKER_LOG_SAMPLE-th worker and the number of
+# workers working, "summary" only the number of workers working.
+THEWALL_WORKER_LOG = "full"
+THEWALL_WORKER_LOG_SAMPLE = 100
+# Number of datasets of earlier uploads kept besides the active one, to switch back to.
+THEWALL_DATASETS_KEPT = 2
@@ -1,4 +1,8 @@
 from django.contrib import admin
-from thewall.models import Day
+from thewall.models import ActiveDataset, Dataset, Day, DayTotal, ProfileProgress
 
 admin.site.register(Day)
+admin.site.register(DayTotal)
+admin.site.register(ProfileProgress)
+admin.site.register(Dataset)
+admin.site.register(ActiveDataset)
@@ -0,0 +1,60 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
+
+from .caching import adata_version, response_key
+from .queries import get_day, get_day_total
+from .views import GOLD_PER_YARD_ICE, YARDS_ICE_PER_FOOT, get_dataset_id
+
+# Async versions of the ice and cost endpoints, for ASGI deployments. A request only needs a thread for its
+# database query, which runs the way Django's async queryset methods run theirs.
+aget_day = sync_to_async(get_day)
+aget_day_total = sync_to_async(get_day_total)
+
+
+def async_cache_response(view):
+    """Cache the data returned by an async view until the stored data changes, and render it as JSON.
+    Like cache_response, the responses have an ETag and requests with a matching If-None-Match get a 304.
+    """
+
+    @wraps(view)
+    async def wrapper(request, **kwargs):
+        # require_GET cannot wrap async views in this version of Django.
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+
+        cache = caches["thewall"]
+        key, etag = response_key(view.__qualname__, kwargs, request, await adata_version())
+        if etag in request.headers.get("If-None-Match", ""):
+            return HttpResponse(status=304, headers={"ETag": etag})
+
+        data = await cache.aget(key)
+        if data is None:
+            try:
+                data = await view(request, **kwargs)
+            except Http404:
+                return JsonResponse({"detail": "Not found."}, status=404)
+            await cache.aset(key, data)
+        return JsonResponse(data, headers={"ETag": etag}, json_dumps_params={"separators": (",", ":")})
+
+    return wrapper
+
+
+@async_cache_response
+async def ice_profile_day(request, profile_id, day_id):
+    current_feet_done, total_feet_done = await aget_day(profile_id, day_id, get_dataset_id(request))
+    return {"day": day_id, "ice_amount": current_feet_done * YARDS_ICE_PER_FOOT}
+
+
+@async_cache_response
+async def cost_profile_day(request, profile_id, day_id):
+    current_feet_done, total_feet_done = await aget_day(profile_id, day_id, get_dataset_id(request))
+    return {"day": day_id, "cost": total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE}
+
+
+@async_cache_response
+async def cost_profile(request, day_id=None):
+    total_feet_done = await aget_day_total(day_id or None, get_dataset_id(request))
+    return {"day": day_id, "cost": total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE}
@@ -0,0 +1,36 @@
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def synthetic_profiles(profiles: int, sections: int, seed: int = 0) -> List[List[int]]:
+    """Generate random profiles, each profile being a list of the remaining heights of its segments."""
+    rng = random.Random(seed)
+    return [[rng.randint(0, 30) for _ in range(sections)] for _ in range(profiles)]
+
+
+def synthetic_file(profiles: int, sections: int, seed: int = 0) -> bytes:
+    """Generate the content of a random wall profile file."""
+    read_data = synthetic_profiles(profiles, sections, seed)
+    return "\n".join(" ".join(str(30 - section) for section in profile) for profile in read_data).encode()
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Call `func` `repeat` times and return the latencies in milliseconds."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(latencies)
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Return the mean, median and 99th percentile of latencies in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)],
+    }
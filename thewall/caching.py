@@ -0,0 +1,59 @@
+import hashlib
+from functools import wraps
+from typing import Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from thewall.models import ACTIVE_DATASET, ActiveDataset
+
+
+def data_version() -> str:
+    """Return the version of the stored data, the active dataset and the revision of the pointer to it.
+    It is read from the database, so every process sees the same version and it never goes back.
+    The creation time of the dataset tells apart datasets that got the same id after the database was reset.
+    """
+    queryset = ActiveDataset.objects.filter(pk=ACTIVE_DATASET, dataset__isnull=False)
+    active = queryset.values_list("dataset_id", "dataset__created", "revision").first()
+    if active is None:
+        return "0"
+    dataset_id, created, revision = active
+    return f"{dataset_id}.{int(created.timestamp() * 1000000)}.{revision}"
+
+
+async def adata_version() -> str:
+    return await sync_to_async(data_version)()
+
+
+def response_key(view_name: str, kwargs: dict, request, version: str) -> Tuple[str, str]:
+    """Return the cache key and the ETag of the response of a view to a request."""
+    endpoint = f"{view_name}:{sorted(kwargs.items())}:{request.GET.urlencode()}"
+    digest = hashlib.sha1(endpoint.encode()).hexdigest()
+    return f"thewall:{version}:{digest}", f'"{version}-{digest[:16]}"'
+
+
+def cache_response(get):
+    """Cache the data of the successful responses of a view's `get` method until the stored data changes.
+    Responses are cached per version of the stored data, which every change of the active data bumps.
+    The responses have an ETag, requests with a matching If-None-Match get a 304 response.
+    """
+
+    @wraps(get)
+    def wrapper(self, request, *args, **kwargs):
+        cache = caches["thewall"]
+        key, etag = response_key(type(self).__qualname__, kwargs, request, data_version())
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        data = cache.get(key)
+        if data is None:
+            response = get(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data)
+        return Response(data, headers={"ETag": etag})
+
+    return wrapper
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+import struct
+import sys
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from thewall.models import Day
+from thewall.queries import dataset_lookup
+
+DAY_FIELDS = ("id", "day_no", "profile_no", "current_feet_done", "total_feet_done")
+
+# The binary format starts with BINARY_MAGIC and is followed by blocks of days. A block is the number of its
+# days as a little-endian uint32, then a column of little-endian uint16 for each of BINARY_FIELDS.
+# A block of 0 days ends the data.
+BINARY_MAGIC = b"WALL\x01"
+BINARY_FIELDS = ("day_no", "profile_no", "current_feet_done", "total_feet_done")
+
+
+def iter_day_rows(chunk_size: int = 2000, fields=DAY_FIELDS, dataset_id: Optional[int] = None) -> Iterator[List[tuple]]:
+    """Read the days of the given dataset, or of the active one, ordered by profile and day, yielding them
+    `chunk_size` at a time.
+    """
+    queryset = Day.objects.filter(dataset=dataset_lookup(dataset_id)).order_by("profile_no", "day_no")
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def iter_json(chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """Encode the days as a JSON array of objects, the way profiles/raw/ shows them."""
+    yield "["
+    separator = ""
+    for chunk in chunks:
+        yield separator + ",".join(json.dumps(dict(zip(DAY_FIELDS, row))) for row in chunk)
+        separator = ","
+    yield "]"
+
+
+def iter_ndjson(chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """Encode the days as JSON objects, one per line."""
+    for chunk in chunks:
+        yield "".join(json.dumps(dict(zip(DAY_FIELDS, row))) + "\n" for row in chunk)
+
+
+def iter_csv(chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """Encode the days as CSV with a header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DAY_FIELDS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_binary(chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode the days, read with BINARY_FIELDS, in the binary columnar format."""
+    yield BINARY_MAGIC
+    for chunk in chunks:
+        block = [struct.pack("<I", len(chunk))]
+        for column in zip(*chunk):
+            values = array("H", column)
+            if sys.byteorder == "big":
+                values.byteswap()
+            block.append(values.tobytes())
+        yield b"".join(block)
+    yield struct.pack("<I", 0)
+
+
+def read_binary(stream: io.RawIOBase) -> Iterator[tuple]:
+    """Decode the days from the binary columnar format, as tuples of BINARY_FIELDS."""
+    if stream.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("Not a binary export of the days")
+    while count := struct.unpack("<I", stream.read(4))[0]:
+        columns = []
+        for _ in BINARY_FIELDS:
+            values = array("H")
+            values.frombytes(stream.read(count * values.itemsize))
+            if sys.byteorder == "big":
+                values.byteswap()
+            columns.append(values)
+        yield from zip(*columns)
+
+
+# Export formats: name -> (encoder, fields read from the days, content type)
+EXPORT_FORMATS = {
+    "json": (iter_json, DAY_FIELDS, "application/json"),
+    "ndjson": (iter_ndjson, DAY_FIELDS, "application/x-ndjson"),
+    "csv": (iter_csv, DAY_FIELDS, "text/csv"),
+    "bin": (iter_binary, BINARY_FIELDS, "application/octet-stream"),
+}
+
+
+def export_days(export_format: str, chunk_size: int = 2000, dataset_id: Optional[int] = None) -> Iterator:
+    """Encode the days of the given dataset, or of the active one, in the given export format, a chunk at a time."""
+    encoder, fields, content_type = EXPORT_FORMATS[export_format]
+    return encoder(iter_day_rows(chunk_size, fields, dataset_id))
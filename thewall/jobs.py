@@ -0,0 +1,118 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from django.db import connection
+from django.forms import ValidationError
+
+from thewall.upload import handle_upload_data
+
+log = logging.getLogger("django_log")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class UploadJob:
+    """An uploaded file that is processed in the background."""
+
+    def __init__(self, path: str, workers: int, options: dict) -> None:
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.workers = workers
+        self.options = options  # keyword arguments of handle_upload_data
+        self.state = QUEUED
+        self.profiles = 0  # profiles processed so far
+        self.error = None
+        self.metrics = None  # metrics of the stages, once done
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.finished = threading.Event()
+
+    def run(self) -> None:
+        self.state = RUNNING
+        self.started_at = time.time()
+        try:
+            with open(self.path, "rb") as file:
+                self.metrics = handle_upload_data(
+                    File(file), self.workers, on_profile=self.set_progress, **self.options
+                )
+            self.state = DONE
+        except ValidationError as ve:
+            self.error = f"File upload failed: {ve.message}"
+            self.state = FAILED
+        except Exception as e:
+            self.error = "File upload failed: Error while processing the file!"
+            self.state = FAILED
+            log.error(f"{self.error} {e}")
+        finally:
+            self.finished_at = time.time()
+            os.remove(self.path)
+            connection.close()
+            self.finished.set()
+
+    def set_progress(self, profiles: int) -> None:
+        self.profiles = profiles
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the job to finish, return whether it did."""
+        return self.finished.wait(timeout)
+
+    def as_dict(self) -> dict:
+        timings = {"queued": self.queued_at, "started": self.started_at, "finished": self.finished_at}
+        if self.started_at is not None:
+            timings["waiting"] = self.started_at - self.queued_at
+        if self.finished_at is not None:
+            timings["running"] = self.finished_at - self.started_at
+        return {
+            "id": self.id,
+            "state": self.state,
+            "profiles": self.profiles,
+            "timings": timings,
+            "stages": self.metrics.as_dict() if self.metrics is not None else None,
+            "error": self.error,
+        }
+
+
+# Jobs are kept in memory, the most recent THEWALL_UPLOAD_JOBS_KEPT finished jobs can be polled.
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_executor = None
+
+
+def submit_upload(uploaded_file: UploadedFile, workers: int, **options) -> UploadJob:
+    """Store the uploaded file and queue it for processing with the given options of handle_upload_data."""
+    global _executor
+
+    with tempfile.NamedTemporaryFile(prefix="thewall-", delete=False) as file:
+        for chunk in uploaded_file.chunks():
+            file.write(chunk)
+    job = UploadJob(file.name, workers, options)
+
+    with _jobs_lock:
+        _jobs[job.id] = job
+        finished = [job_id for job_id, other in _jobs.items() if other.finished.is_set()]
+        for job_id in finished[: max(len(finished) - settings.THEWALL_UPLOAD_JOBS_KEPT, 0)]:
+            del _jobs[job_id]
+
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.THEWALL_UPLOAD_JOB_WORKERS, thread_name_prefix="thewall-upload")
+        _executor.submit(job.run)
+    return job
+
+
+def get_job(job_id: str) -> Optional[UploadJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
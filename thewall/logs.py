@@ -0,0 +1,44 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+class QueuedFileHandler(QueueHandler):
+    """Write the records to a file from a background thread.
+    Logging a record only puts it on a queue, so the threads that log neither wait for the file nor for
+    each other. The records are written in batches and the file is flushed whenever the queue is empty.
+    """
+
+    def __init__(self, filename: str, mode: str = "a", encoding: Optional[str] = None, delay: bool = False) -> None:
+        super().__init__(queue.SimpleQueue())
+        self.file_handler = _BufferedFileHandler(filename, mode, encoding, delay)
+        self.listener = _FlushingListener(self.queue, self.file_handler)
+        self.listener.start()
+
+    def close(self) -> None:
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.file_handler.close()
+        super().close()
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """A file handler that leaves flushing the file to the listener."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _FlushingListener(QueueListener):
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            # Nothing else to write for now.
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
@@ -0,0 +1,64 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+
+from thewall.benchmarks import measure, synthetic_profiles
+from thewall.models import Day
+from thewall.upload import save_days, single_thread_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the day table with random profiles and compare the day endpoints with and without "
+        "the (dataset, profile_no, day_no) index. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=5000)
+        parser.add_argument("--sections", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        read_data = synthetic_profiles(options["profiles"], options["sections"], options["seed"])
+        index = next(index for index in Day._meta.indexes if index.name == "day_dataset_profile_day_idx")
+        schema_editor = connection.schema_editor()
+
+        with transaction.atomic():
+            save_days(single_thread_days(read_data))
+            rows = list(Day.objects.values_list("dataset_id", "profile_no", "day_no"))
+            lookups = random.Random(options["seed"]).choices(rows, k=options["requests"])
+            self.stdout.write(f"{len(rows)} days stored, {len(lookups)} requests per endpoint")
+
+            with connection.cursor() as cursor:
+                cursor.execute(str(index.remove_sql(Day, schema_editor)))
+            self.report("Without index", lookups)
+
+            with connection.cursor() as cursor:
+                cursor.execute(str(index.create_sql(Day, schema_editor)))
+            self.report("With index", lookups)
+
+            transaction.set_rollback(True)
+
+    def report(self, title, lookups):
+        self.stdout.write(f"\n{title}")
+        dataset_id, profile_no, day_no = lookups[0]
+        plan = Day.objects.filter(dataset_id=dataset_id, day_no=day_no, profile_no=profile_no).explain()
+        self.stdout.write(f"  plan: {plan}")
+
+        client = Client()
+        for endpoint in ("days", "overview"):
+            requests = iter(lookups)
+
+            def get():
+                dataset_id, profile_no, day_no = next(requests)
+                response = client.get(f"/profiles/{profile_no}/{endpoint}/{day_no}/")
+                assert response.status_code == 200, response.status_code
+
+            latencies = measure(get, len(lookups))
+            self.stdout.write(
+                f"  profiles/<profile_no>/{endpoint}/<day_no>/: "
+                + ", ".join(f"{name} {value:.3f}" for name, value in latencies.items())
+            )
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from thewall.benchmarks import synthetic_profiles
+from thewall.export import EXPORT_FORMATS, export_days
+from thewall.models import Day
+from thewall.serializers import DaySerializer
+from thewall.upload import save_progress, single_thread_progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the day table with random profiles and compare the throughput of the export formats with "
+        "the serializer based JSON of profiles/raw/. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=5000)
+        parser.add_argument("--sections", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        read_data = synthetic_profiles(options["profiles"], options["sections"], options["seed"])
+
+        with transaction.atomic():
+            save_progress(single_thread_progress(read_data))
+            rows = Day.objects.count()
+            self.stdout.write(f"{rows} days stored")
+
+            def serializer_json():
+                yield JSONRenderer().render(DaySerializer(Day.objects.order_by("profile_no", "day_no"), many=True).data)
+
+            self.report("serializer json", rows, serializer_json())
+            for export_format in EXPORT_FORMATS:
+                self.report(export_format, rows, export_days(export_format))
+
+            transaction.set_rollback(True)
+
+    def report(self, name, rows, chunks):
+        start = time.perf_counter()
+        size = sum(len(chunk if isinstance(chunk, bytes) else chunk.encode()) for chunk in chunks)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  {name}: {elapsed:.3f}s, {rows / elapsed:.0f} rows/s, {size / 1e6:.2f} MB, {size / 1e6 / elapsed:.1f} MB/s"
+        )
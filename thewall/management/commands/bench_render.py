@@ -0,0 +1,102 @@
+import json
+import random
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import generics
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from thewall import renderers, views
+from thewall.benchmarks import measure, synthetic_profiles
+from thewall.models import Day
+from thewall.queries import get_day
+from thewall.serializers import CostSerializer, DaySerializer, IceSerializer
+from thewall.upload import save_progress, single_thread_progress
+
+
+class SerializerIceProfileDay(generics.ListAPIView):
+    """profiles/<profile_no>/days/<day_no>/ as it was, validating its own values with a serializer."""
+
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, day_id, profile_id, format=None):
+        current_feet_done, total_feet_done = get_day(profile_id, day_id)
+        serializer = IceSerializer(data={"day": day_id, "ice_amount": current_feet_done * views.YARDS_ICE_PER_FOOT})
+        if serializer.is_valid():
+            return Response(serializer.data)
+
+
+class SerializerCostProfileDay(generics.ListAPIView):
+    """profiles/<profile_no>/overview/<day_no>/ as it was, validating its own values with a serializer."""
+
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, day_id, profile_id, format=None):
+        current_feet_done, total_feet_done = get_day(profile_id, day_id)
+        cost = total_feet_done * views.YARDS_ICE_PER_FOOT * views.GOLD_PER_YARD_ICE
+        serializer = CostSerializer(data={"day": day_id, "cost": cost})
+        if serializer.is_valid():
+            return Response(serializer.data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request time of the ice and cost views with the serializer based views they replaced, "
+        "and the JSON encoders on a page of days. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=1000)
+        parser.add_argument("--sections", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        read_data = synthetic_profiles(options["profiles"], options["sections"], options["seed"])
+
+        with transaction.atomic():
+            save_progress(single_thread_progress(read_data))
+            rows = list(Day.objects.values_list("profile_no", "day_no"))
+            lookups = random.Random(options["seed"]).choices(rows, k=options["requests"])
+            self.stdout.write(f"{len(rows)} days stored, {len(lookups)} requests per view")
+
+            self.stdout.write("\nViews")
+            for name, view in (
+                ("ice, serializer", SerializerIceProfileDay.as_view()),
+                ("ice", views.IceProfileDay.as_view()),
+                ("cost, serializer", SerializerCostProfileDay.as_view()),
+                ("cost", views.CostProfileDay.as_view()),
+            ):
+                self.report(name, measure(self.requester(view, lookups), len(lookups)))
+
+            self.stdout.write("\nEncoders, a page of 1000 days")
+            page = DaySerializer(Day.objects.order_by("profile_no", "day_no")[:1000], many=True).data
+            for name, encode in (
+                ("json", lambda: json.dumps(page).encode()),
+                ("drf", lambda: JSONRenderer().render(page)),
+                ("orjson" if renderers.orjson is not None else "fast (stdlib)", lambda: renderers.dumps(page)),
+            ):
+                self.report(name, measure(encode, 200))
+
+            transaction.set_rollback(True)
+
+    def requester(self, view, lookups):
+        factory = APIRequestFactory()
+        cache = caches["thewall"]
+        requests = iter(lookups)
+
+        def get():
+            profile_no, day_no = next(requests)
+            # Every request goes to the database, not to the response cache.
+            cache.clear()
+            response = view(factory.get("/"), profile_id=profile_no, day_id=day_no)
+            response.render()
+            assert response.status_code == 200, response.status_code
+
+        return get
+
+    def report(self, name, latencies):
+        self.stdout.write(f"  {name}: " + ", ".join(f"{key} {value:.4f}" for key, value in latencies.items()))
@@ -0,0 +1,118 @@
+import json
+import platform
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from thewall.benchmarks import measure, synthetic_file
+from thewall.upload import (
+    days_progress,
+    multi_thread_days_literal,
+    multi_thread_progress,
+    parse_data,
+    save_progress,
+    single_thread_progress_parallel,
+)
+
+DEFAULT_SCALES = "100x100x-1,1000x500x-1,5000x2000x-1,1000x500x50,1000x500x5000"
+QUERY_ENDPOINTS = (
+    "/profiles/1/days/1/",
+    "/profiles/1/overview/1/",
+    "/profiles/overview/1/",
+    "/profiles/overview/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the parsing, simulation, saving and query stages of uploads of random files at several scales, "
+        "with their peak memory, and print the results as JSON. Each stage is run twice: the time is taken "
+        "from a plain run and the peak memory from a traced one. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            default=DEFAULT_SCALES,
+            help="Comma separated PROFILESxSECTIONSxWORKERS, -1 workers for a crew per section.",
+        )
+        parser.add_argument("--requests", type=int, default=100, help="Requests per query endpoint.")
+        parser.add_argument("--literal", action="store_true", help="Also time the literal simulation.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="File to write the JSON results to, the standard output by default.")
+
+    def handle(self, *args, **options):
+        try:
+            scales = [tuple(int(number) for number in scale.split("x")) for scale in options["scales"].split(",")]
+        except ValueError:
+            raise CommandError("Scales must be given as PROFILESxSECTIONSxWORKERS")
+
+        results = {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "storage": settings.THEWALL_STORAGE,
+            "created": time.time(),
+            "runs": [self.run(*scale, options) for scale in scales],
+        }
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run(self, profiles, sections, workers, options):
+        content = synthetic_file(profiles, sections, options["seed"])
+        run = {"profiles": profiles, "sections": sections, "workers": workers, "bytes": len(content), "stages": {}}
+
+        read_data = self.stage(run, "parse", lambda: parse_data(SimpleUploadedFile("file_uploaded", content)))
+        if workers == -1:
+            progress = self.stage(run, "simulate", lambda: list(single_thread_progress_parallel(read_data)))
+        else:
+            progress = self.stage(run, "simulate", lambda: multi_thread_progress(read_data, workers))
+            if options["literal"]:
+                self.stage(
+                    run, "simulate_literal", lambda: list(days_progress(multi_thread_days_literal(read_data, workers)))
+                )
+
+        with transaction.atomic():
+            self.stage(run, "persist", lambda: save_progress(progress))
+            run["queries"] = {endpoint: self.query(endpoint, options["requests"]) for endpoint in QUERY_ENDPOINTS}
+            transaction.set_rollback(True)
+        return run
+
+    def stage(self, run, name, func):
+        # Tracing the allocations slows a stage down several times, so the peak memory comes from a run of its
+        # own whose changes are rolled back, and the time from a run that is not traced.
+        tracemalloc.start()
+        with transaction.atomic():
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            transaction.set_rollback(True)
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        run["stages"][name] = {"seconds": elapsed, "peak_memory_bytes": peak}
+        return result
+
+    def query(self, endpoint, requests):
+        client = Client()
+        cache = caches["thewall"]
+
+        def get():
+            # Every request goes to the database, not to the response cache.
+            cache.clear()
+            response = client.get(endpoint)
+            assert response.status_code == 200, response.status_code
+
+        return measure(get, requests)
@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from thewall.export import EXPORT_FORMATS, export_days
+
+
+class Command(BaseCommand):
+    help = "Export the days of a dataset, ordered by profile and day, to a file or to the standard output."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write to, the standard output by default.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--dataset", type=int, help="Dataset to export, the active one by default.")
+
+    def handle(self, *args, **options):
+        chunks = export_days(options["format"], options["chunk_size"], options["dataset"])
+        if options["output"]:
+            with open(options["output"], "wb") as file:
+                write_chunks(file, chunks)
+        else:
+            write_chunks(sys.stdout.buffer, chunks)
+            sys.stdout.flush()
+
+
+def write_chunks(file, chunks):
+    for chunk in chunks:
+        file.write(chunk if isinstance(chunk, bytes) else chunk.encode())
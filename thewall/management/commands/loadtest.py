@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from thewall.benchmarks import latency_summary
+
+DEFAULT_PATHS = (
+    "profiles/1/days/1/",
+    "profiles/1/overview/1/",
+    "profiles/overview/1/",
+    "profiles/overview/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send GET requests over many concurrent keep-alive connections to running deployments of the API, "
+        "and compare their requests per second and latencies. For example, with the WSGI deployment on port "
+        "8000 and the ASGI one on port 8001: loadtest wsgi=http://127.0.0.1:8000/ "
+        "asgi=http://127.0.0.1:8001/async/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("targets", nargs="+", metavar="NAME=URL", help="Base URL of a deployment to test.")
+        parser.add_argument("--concurrency", type=int, default=100, help="Concurrent connections.")
+        parser.add_argument("--requests", type=int, default=10000, help="Requests per deployment.")
+        parser.add_argument(
+            "--path", dest="paths", action="append", help="Path requested in turns, relative to the base URLs."
+        )
+        parser.add_argument("--output", help="File to write the JSON results to, the standard output by default.")
+
+    def handle(self, *args, **options):
+        try:
+            targets = dict(target.split("=", 1) for target in options["targets"])
+        except ValueError:
+            raise CommandError("Targets must be given as NAME=URL")
+        paths = options["paths"] or DEFAULT_PATHS
+
+        results = {}
+        for name, url in targets.items():
+            results[name] = asyncio.run(load(url, paths, options["concurrency"], options["requests"]))
+            self.stderr.write(
+                f"{name}: {results[name]['requests_per_second']:.0f} requests/s, "
+                f"p50 {results[name]['p50_ms']:.1f}ms, p99 {results[name]['p99_ms']:.1f}ms, "
+                f"{results[name]['errors']} errors"
+            )
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+
+async def load(base_url: str, paths, concurrency: int, requests: int) -> dict:
+    """Send `requests` requests to the paths under `base_url` over `concurrency` connections."""
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip("/") + "/"
+    numbers = iter(range(requests))  # shared by the connections
+    latencies = []
+    errors = 0
+
+    async def connection():
+        nonlocal errors
+        reader = writer = None
+        for number in numbers:
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                status, keep_alive = await fetch(reader, writer, url.netloc, prefix + paths[number % len(paths)])
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                status, keep_alive = None, False
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors += 1
+            if not keep_alive and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "url": base_url,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        **latency_summary(latencies),
+    }
+
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str):
+    """Send a GET request and read the response, return its status and whether the connection is kept."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()).strip():
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        # The body ends with the connection.
+        await reader.read()
+        return status, False
+    return status, headers.get("connection") != "close"
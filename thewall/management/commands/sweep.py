@@ -0,0 +1,42 @@
+import json
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.forms import ValidationError
+
+from thewall.sweep import crew_sweep, parse_crew_counts
+from thewall.upload import iter_profiles
+from thewall.views import GOLD_PER_YARD_ICE, YARDS_ICE_PER_FOOT
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the completion day and the cost of the multi-threaded version of a profile file for each of "
+        "a range of crew counts, as JSON. Nothing is stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Profile file, in the format of an upload.")
+        parser.add_argument("--workers", required=True, help='Crew counts and ranges, e.g. "1-10,20,100-1000:100".')
+        parser.add_argument("--processes", type=int, help="Processes to sweep on, THEWALL_PROCESSES by default.")
+
+    def handle(self, *args, **options):
+        try:
+            crew_counts = parse_crew_counts(options["workers"])
+            with open(options["file"], "rb") as file:
+                sweep = crew_sweep(iter_profiles(File(file)), crew_counts, options["processes"])
+        except ValidationError as ve:
+            raise CommandError(ve.message)
+        except OSError as e:
+            raise CommandError(e)
+
+        results = [
+            {
+                "workers": workers,
+                "day": day_no,
+                "ice_amount": feet * YARDS_ICE_PER_FOOT,
+                "cost": feet * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE,
+            }
+            for workers, day_no, feet in sweep
+        ]
+        self.stdout.write(json.dumps(results, indent=2))
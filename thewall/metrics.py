@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, Optional
+
+from django.db import connection
+
+
+class UploadMetrics:
+    """Time spent, queries executed and amounts handled in each stage of an upload.
+    Stages can be nested, the time and queries of a stage do not include those of the stages inside it.
+    """
+
+    def __init__(self) -> None:
+        self.seconds = defaultdict(float)  # seconds = {stage: time spent}
+        self.queries = defaultdict(int)  # queries = {stage: queries executed}
+        self.counts = defaultdict(int)  # counts = {what: amount}, e.g. bytes read or rows inserted
+        self.total_seconds = 0.0
+        self._stages = ["other"]
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._switch()
+        self._stages.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stages.pop()
+
+    def iter_stage(self, name: str, iterable: Iterable) -> Iterator:
+        """Pass the items through, the time spent producing them being spent in the given stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, what: str, amount: int = 1) -> None:
+        self.counts[what] += amount
+
+    def _switch(self) -> None:
+        """Add the time since the last switch to the current stage."""
+        now = time.perf_counter()
+        self.seconds[self._stages[-1]] += now - self._started
+        self._started = now
+
+    def _execute(self, execute, sql, params, many, context):
+        self.queries[self._stages[-1]] += 1
+        return execute(sql, params, many, context)
+
+    def server_timing(self) -> str:
+        """Format the stage durations as a Server-Timing header."""
+        timings = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.seconds.items()]
+        timings.append(f"total;dur={self.total_seconds * 1000:.1f}")
+        return ", ".join(timings)
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": dict(self.seconds),
+            "queries": dict(self.queries),
+            "counts": dict(self.counts),
+            "total_seconds": self.total_seconds,
+        }
+
+
+_current = ContextVar("upload_metrics", default=None)
+
+
+def current_metrics() -> Optional[UploadMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Spend the time of the block in the given stage of the current upload, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+    else:
+        with metrics.stage(name):
+            yield
+
+
+def iter_stage(name: str, iterable: Iterable) -> Iterable:
+    metrics = _current.get()
+    return iterable if metrics is None else metrics.iter_stage(name, iterable)
+
+
+def count(what: str, amount: int = 1) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(what, amount)
+
+
+@contextmanager
+def record_upload() -> Iterator[UploadMetrics]:
+    """Record the metrics of the upload handled in the block, and add them to the totals of the process."""
+    metrics = UploadMetrics()
+    token = _current.set(metrics)
+    succeeded = False
+    try:
+        with connection.execute_wrapper(metrics._execute):
+            yield metrics
+        succeeded = True
+    finally:
+        metrics._switch()
+        metrics.total_seconds = sum(metrics.seconds.values())
+        _current.reset(token)
+        _add_to_totals(metrics, succeeded)
+
+
+# Totals of the uploads handled by this process, for /metrics.
+_totals_lock = threading.Lock()
+_uploads = defaultdict(int)  # _uploads = {result: uploads}
+_seconds = defaultdict(float)
+_queries = defaultdict(int)
+_counts = defaultdict(int)
+_last_seconds = {}
+
+
+def _add_to_totals(metrics: UploadMetrics, succeeded: bool) -> None:
+    with _totals_lock:
+        _uploads["success" if succeeded else "failure"] += 1
+        for name, seconds in metrics.seconds.items():
+            _seconds[name] += seconds
+        for name, queries in metrics.queries.items():
+            _queries[name] += queries
+        for what, amount in metrics.counts.items():
+            _counts[what] += amount
+        _last_seconds.clear()
+        _last_seconds.update(metrics.seconds)
+        _last_seconds["total"] = metrics.total_seconds
+
+
+def prometheus_text() -> str:
+    """Format the totals of the uploads in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name: str, kind: str, help: str, values: Dict[str, float], label: Optional[str] = None) -> None:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in sorted(values.items()):
+            labels = f'{{{label}="{key}"}}' if label else ""
+            lines.append(f"{name}{labels} {value}")
+
+    with _totals_lock:
+        metric("thewall_uploads_total", "counter", "Uploads handled.", _uploads, "result")
+        metric("thewall_upload_stage_seconds_total", "counter", "Time spent in each upload stage.", _seconds, "stage")
+        metric(
+            "thewall_upload_stage_queries_total", "counter", "Queries executed in each upload stage.", _queries, "stage"
+        )
+        for what, amount in sorted(_counts.items()):
+            metric(f"thewall_upload_{what}_total", "counter", f"Upload {what.replace('_', ' ')}.", {"": amount})
+        metric(
+            "thewall_last_upload_stage_seconds",
+            "gauge",
+            "Time spent in each stage of the last upload.",
+            _last_seconds,
+            "stage",
+        )
+    return "\n".join(lines) + "\n"
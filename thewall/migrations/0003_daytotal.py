@@ -0,0 +1,41 @@
+# Generated by Django 4.0.2 on 2026-10-18 15:38
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_day_totals(apps, schema_editor):
+    Day = apps.get_model('thewall', 'Day')
+    DayTotal = apps.get_model('thewall', 'DayTotal')
+    total_feet_done = 0
+    day_totals = []
+    for day in Day.objects.values('day_no').annotate(current_feet_done=Sum('current_feet_done')).order_by('day_no'):
+        total_feet_done += day['current_feet_done']
+        day_totals.append(
+            DayTotal(
+                day_no=day['day_no'],
+                current_feet_done=day['current_feet_done'],
+                total_feet_done=total_feet_done,
+            )
+        )
+    DayTotal.objects.bulk_create(day_totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thewall', '0002_rename_feet_done_day_current_feet_done_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_no', models.PositiveSmallIntegerField(unique=True)),
+                ('current_feet_done', models.PositiveIntegerField()),
+                ('total_feet_done', models.PositiveBigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(fill_day_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.2 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thewall', '0003_daytotal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='day',
+            index=models.Index(fields=['profile_no', 'day_no'], name='day_profile_day_idx'),
+        ),
+    ]
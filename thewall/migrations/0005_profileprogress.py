@@ -0,0 +1,34 @@
+# Generated by Django 4.0.2 on 2026-10-18 15:40
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+def fill_profile_progress(apps, schema_editor):
+    Day = apps.get_model('thewall', 'Day')
+    ProfileProgress = apps.get_model('thewall', 'ProfileProgress')
+    days = Day.objects.values_list('profile_no', 'current_feet_done').order_by('profile_no', 'day_no')
+    ProfileProgress.objects.bulk_create(
+        ProfileProgress(profile_no=profile_no, daily_feet=[current_feet_done for _, current_feet_done in profile_days])
+        for profile_no, profile_days in groupby(days.iterator(), key=lambda day: day[0])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thewall', '0004_day_profile_day_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_no', models.PositiveSmallIntegerField(unique=True)),
+                ('daily_feet', models.JSONField()),
+            ],
+        ),
+        migrations.RunPython(fill_profile_progress, migrations.RunPython.noop),
+    ]
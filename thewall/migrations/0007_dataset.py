@@ -0,0 +1,58 @@
+# Generated by Django 4.0.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_datasets(apps, schema_editor):
+    """Put the stored progress in the dataset of the last upload, and make it the active one."""
+    Dataset = apps.get_model('thewall', 'Dataset')
+    ActiveDataset = apps.get_model('thewall', 'ActiveDataset')
+    stored = [apps.get_model('thewall', name) for name in ('Day', 'ProfileProgress', 'DayTotal')]
+
+    dataset = Dataset.objects.order_by('-id').first()
+    if dataset is None and any(model.objects.exists() for model in stored):
+        dataset = Dataset.objects.create()
+    if dataset is not None:
+        # The earlier uploads were replaced, their progress is gone.
+        Dataset.objects.exclude(pk=dataset.pk).delete()
+        for model in stored:
+            model.objects.update(dataset=dataset)
+    ActiveDataset.objects.create(pk=1, dataset=dataset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thewall', '0006_upload'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='Upload',
+            new_name='Dataset',
+        ),
+        migrations.CreateModel(
+            name='ActiveDataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='thewall.dataset')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='day',
+            name='dataset',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='thewall.dataset'),
+        ),
+        migrations.AddField(
+            model_name='daytotal',
+            name='dataset',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='thewall.dataset'),
+        ),
+        migrations.AddField(
+            model_name='profileprogress',
+            name='dataset',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='thewall.dataset'),
+        ),
+        migrations.RunPython(fill_datasets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.0.2 on 2026-10-18 17:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thewall', '0007_dataset'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='day',
+            name='day_profile_day_idx',
+        ),
+        migrations.AlterField(
+            model_name='day',
+            name='dataset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='thewall.dataset'),
+        ),
+        migrations.AlterField(
+            model_name='daytotal',
+            name='dataset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='thewall.dataset'),
+        ),
+        migrations.AlterField(
+            model_name='daytotal',
+            name='day_no',
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='profileprogress',
+            name='dataset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='thewall.dataset'),
+        ),
+        migrations.AlterField(
+            model_name='profileprogress',
+            name='profile_no',
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='day',
+            index=models.Index(fields=['dataset', 'profile_no', 'day_no'], name='day_dataset_profile_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='daytotal',
+            constraint=models.UniqueConstraint(fields=('dataset', 'day_no'), name='daytotal_dataset_day_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='profileprogress',
+            constraint=models.UniqueConstraint(fields=('dataset', 'profile_no'), name='profileprogress_dataset_profile_uniq'),
+        ),
+    ]
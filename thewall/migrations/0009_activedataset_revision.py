@@ -0,0 +1,18 @@
+# Generated by Django 4.0.2 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thewall', '0008_dataset_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activedataset',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,11 +1,76 @@
 from django.db import models
 
 
+class Dataset(models.Model):
+    """The progress stored by an upload. The active dataset is the one shown unless another one is asked for."""
+
+    # Hash of the file and the number of workers, unknown when only some profiles were replaced.
+    digest = models.CharField(max_length=64, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Dataset {self.pk}"
+
+
+# Primary key of the single row of ActiveDataset.
+ACTIVE_DATASET = 1
+
+
+class ActiveDataset(models.Model):
+    """The pointer to the active dataset, a single row that is updated to switch datasets."""
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.PROTECT, null=True)
+    # Bumped by every change of the active data, the cached responses and their ETags are per revision.
+    revision = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Active {self.dataset}"
+
+
 class Day(models.Model):
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE)
     day_no = models.PositiveSmallIntegerField()
     profile_no = models.PositiveSmallIntegerField()
     current_feet_done = models.PositiveSmallIntegerField()
     total_feet_done = models.PositiveSmallIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["dataset", "profile_no", "day_no"], name="day_dataset_profile_day_idx"),
+        ]
+
     def __str__(self):
         return f"Profile {self.profile_no}; Day {self.day_no}"
+
+
+class ProfileProgress(models.Model):
+    """Feet done on each day by a profile, a compact form of its day rows."""
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE)
+    profile_no = models.PositiveSmallIntegerField()
+    daily_feet = models.JSONField()  # feet done on each day, starting from day 1
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "profile_no"], name="profileprogress_dataset_profile_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Profile {self.profile_no}"
+
+
+class DayTotal(models.Model):
+    """Feet done on a day by all the profiles together, filled in when a file is uploaded."""
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE)
+    day_no = models.PositiveSmallIntegerField()
+    current_feet_done = models.PositiveIntegerField()
+    total_feet_done = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "day_no"], name="daytotal_dataset_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Day {self.day_no}"
@@ -0,0 +1,60 @@
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class DayKeysetPagination(BasePagination):
+    """Paginate days by (profile_no, day_no), the cursor being the last day of the previous page.
+    Every page is a single indexed range query, however deep into the table it is.
+    """
+
+    page_size = 1000
+    max_page_size = 10000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by("profile_no", "day_no")
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                profile_no, day_no = (int(number) for number in cursor.split("-"))
+            except ValueError:
+                raise NotFound("Invalid cursor")
+            queryset = queryset.filter(Q(profile_no__gt=profile_no) | Q(profile_no=profile_no, day_no__gt=day_no))
+
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[: self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, f"{self.last.profile_no}-{self.last.day_no}")
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,20 @@
+from typing import List
+
+# The work sent to other processes lives here, apart from the models: a process that is not forked
+# imports the module of the function it runs, and Django is not set up in it.
+
+
+def profile_daily_feet(profile: List[int]) -> List[int]:
+    """Return the feet done on each day (starting from day 1) by the crews of a profile."""
+    heights = [0] * 31  # heights[h] = number of sections with remaining height h
+    for section in profile:
+        heights[section] += 1
+
+    daily_feet = []
+    working = 0  # sections still under construction
+    # An empty profile has no progress, like a profile that is already built.
+    for height in range(max(profile, default=0), 0, -1):
+        working += heights[height]
+        daily_feet.append(working)
+    daily_feet.reverse()
+    return daily_feet
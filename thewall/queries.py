@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Subquery
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from thewall.models import ACTIVE_DATASET, ActiveDataset, Day, DayTotal, ProfileProgress
+
+
+def dataset_lookup(dataset_id: Optional[int] = None):
+    """Return what to filter the stored progress by to read the given dataset, or the active one.
+    The active dataset is looked up in the same query as the progress.
+    """
+    if dataset_id is not None:
+        return dataset_id
+    return Subquery(ActiveDataset.objects.filter(pk=ACTIVE_DATASET).values("dataset_id"))
+
+
+def get_day(profile_no: int, day_no: int, dataset_id: Optional[int] = None) -> Tuple[int, int]:
+    """Return the feet done by a profile on a day and up to that day.
+    Raise Http404 if the profile was not worked on that day.
+    """
+    dataset = dataset_lookup(dataset_id)
+    if settings.THEWALL_STORAGE == "compact":
+        progress = get_object_or_404(ProfileProgress, dataset=dataset, profile_no=profile_no)
+        if not 1 <= day_no <= len(progress.daily_feet):
+            raise Http404
+        return progress.daily_feet[day_no - 1], sum(progress.daily_feet[:day_no])
+
+    item = get_object_or_404(Day, dataset=dataset, day_no=day_no, profile_no=profile_no)
+    return item.current_feet_done, item.total_feet_done
+
+
+def get_day_total(day_no: Optional[int] = None, dataset_id: Optional[int] = None) -> int:
+    """Return the feet done by all the profiles up to a day, or up to the last day without one.
+    Raise Http404 if the wall was not worked on that day.
+    """
+    totals = DayTotal.objects.filter(dataset=dataset_lookup(dataset_id))
+    if day_no is not None:
+        return get_object_or_404(totals, day_no=day_no).total_feet_done
+    # The totals of the last day are the totals of the whole wall.
+    total_feet_done = totals.order_by("-day_no").values_list("total_feet_done", flat=True).first()
+    if total_feet_done is None:
+        raise Http404
+    return total_feet_done
+
+
+def get_daily_feet(profile_no: int, dataset_id: Optional[int] = None) -> List[int]:
+    """Return the feet done by a profile on each day, starting from day 1, read from its single progress row.
+    Raise Http404 if the profile was not worked on at all.
+    """
+    queryset = ProfileProgress.objects.values_list("daily_feet", flat=True)
+    return get_object_or_404(queryset, dataset=dataset_lookup(dataset_id), profile_no=profile_no)
+
+
+def get_completion(dataset_id: Optional[int] = None) -> Tuple[int, int]:
+    """Return the day the whole wall is completed and the feet done by then.
+    Raise Http404 if the wall was not worked on at all.
+    """
+    totals = DayTotal.objects.filter(dataset=dataset_lookup(dataset_id))
+    last = totals.order_by("-day_no").values_list("day_no", "total_feet_done").first()
+    if last is None:
+        raise Http404
+    return last
+
+
+def get_days(
+    pairs: Iterable[Tuple[int, int]], dataset_id: Optional[int] = None
+) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """Return the feet done on a day and up to that day for each of the given (profile, day) pairs.
+    Pairs whose profile was not worked on that day are left out.
+    """
+    dataset = dataset_lookup(dataset_id)
+    pairs = set(pairs)
+    profile_numbers = sorted({profile_no for profile_no, day_no in pairs})
+    days = {}
+
+    # Few enough profiles per query to stay under the limit of query parameters of every database.
+    for start in range(0, len(profile_numbers), 500):
+        batch = set(profile_numbers[start : start + 500])
+        if settings.THEWALL_STORAGE == "compact":
+            queryset = ProfileProgress.objects.filter(dataset=dataset, profile_no__in=batch)
+            for profile_no, daily_feet in queryset.values_list("profile_no", "daily_feet"):
+                total_feet_done = 0
+                for day_no, current_feet_done in enumerate(daily_feet, start=1):
+                    total_feet_done += current_feet_done
+                    if (profile_no, day_no) in pairs:
+                        days[profile_no, day_no] = current_feet_done, total_feet_done
+        else:
+            # A profile has a row for each of its days, about 30 at most, so they are all read.
+            queryset = Day.objects.filter(dataset=dataset, profile_no__in=batch)
+            for profile_no, day_no, current_feet_done, total_feet_done in queryset.values_list(
+                "profile_no", "day_no", "current_feet_done", "total_feet_done"
+            ):
+                if (profile_no, day_no) in pairs:
+                    days[profile_no, day_no] = current_feet_done, total_feet_done
+    return days
+
+
+def get_series(
+    profile_no: int, first_day: int = 1, last_day: Optional[int] = None, dataset_id: Optional[int] = None
+) -> List[Tuple[int, int, int]]:
+    """Return the day, the feet done on the day and up to it, for the days of a profile between
+    `first_day` and `last_day`, both included.
+    Raise Http404 if the profile was not worked on at all.
+    """
+    dataset = dataset_lookup(dataset_id)
+    if settings.THEWALL_STORAGE == "compact":
+        daily_feet = get_object_or_404(ProfileProgress, dataset=dataset, profile_no=profile_no).daily_feet
+        series = []
+        total_feet_done = 0
+        # A last day before day 1 leaves no days, the same as the day rows filtered by it.
+        days = daily_feet if last_day is None else daily_feet[: max(last_day, 0)]
+        for day_no, current_feet_done in enumerate(days, start=1):
+            total_feet_done += current_feet_done
+            if day_no >= first_day:
+                series.append((day_no, current_feet_done, total_feet_done))
+        return series
+
+    queryset = Day.objects.filter(dataset=dataset, profile_no=profile_no, day_no__gte=first_day)
+    if last_day is not None:
+        queryset = queryset.filter(day_no__lte=last_day)
+    series = list(queryset.order_by("day_no").values_list("day_no", "current_feet_done", "total_feet_done"))
+    if not series and not Day.objects.filter(dataset=dataset, profile_no=profile_no).exists():
+        raise Http404
+    return series
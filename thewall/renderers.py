@@ -0,0 +1,31 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is used without it
+    orjson = None
+
+
+def dumps(data) -> bytes:
+    """Encode data as compact JSON, with orjson when it is installed.
+    Types JSON does not know are encoded the way DRF encodes them.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """A JSON renderer that encodes with orjson when it is installed. The output is compact unless an indent
+    is asked for, with `Accept: application/json; indent=N` or by the browsable API, which DRF renders.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -0,0 +1,97 @@
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.forms import ValidationError
+
+# Most crew counts a single sweep can be asked for.
+MAX_CREW_COUNTS = 10000
+
+
+def parse_crew_counts(spec: str) -> List[int]:
+    """Parse crew counts given as comma separated counts and ranges, e.g. "1-10,20,100-1000:100",
+    a range including both its ends and taking an optional step. Return them sorted, without repetitions.
+    """
+    counts = set()
+    for part in spec.split(","):
+        try:
+            bounds, _, step = part.partition(":")
+            first, _, last = bounds.partition("-")
+            first = int(first)
+            last = int(last) if last else first
+            step = int(step) if step else 1
+        except ValueError:
+            raise ValidationError(f"Crew counts: {part.strip()!r} is not a count or a range of counts")
+        if first < 1 or step < 1:
+            raise ValidationError("Crew counts: Counts and steps must be at least 1")
+        if (last - first) // step + 1 + len(counts) > MAX_CREW_COUNTS:
+            raise ValidationError(f"Crew counts: No more than {MAX_CREW_COUNTS} counts can be swept at once")
+        counts.update(range(first, last + 1, step))
+    return sorted(counts)
+
+
+def crew_sections(read_data: Iterable[List[int]], crews: int) -> array:
+    """Return the feet built on each of the sections the first `crews` crews pick up, in order.
+    As in multi_thread_progress, those sections are built until they are done, at least one foot each.
+    The sections nobody picks up are still read, so that the whole file is validated.
+    """
+    sections = (max(section, 1) for section in chain.from_iterable(read_data))
+    worked = array("B", islice(sections, crews))
+    deque(sections, maxlen=0)
+    return worked
+
+
+def sweep_sections(sections: array, counts: List[int]) -> Tuple[List[Tuple[int, int]], int, int]:
+    """Return the completion day and the feet built by the crews of the first sections, for each of the
+    given sorted counts of sections, followed by the completion day and the feet of all the sections.
+    Each count picks up where the previous one stopped, so the sections are walked once for all the counts.
+    """
+    results = []
+    day = feet = 0
+    position = 0
+    for count in chain(counts, [len(sections)]):
+        if count > position:
+            day = max(day, max(sections[position:count]))
+            feet += sum(sections[position:count])
+            position = count
+        results.append((day, feet))
+    return results[:-1], day, feet
+
+
+def crew_sweep(
+    read_data: Iterable[List[int]], crew_counts: Iterable[int], processes: Optional[int] = None
+) -> List[Tuple[int, int, int]]:
+    """Return the crew count, the completion day and the feet built for each of the given crew counts,
+    with the schedule of multi_thread_progress. The file is read once for all of them.
+    With several processes the sections are split between them, and the completion day and the feet
+    of each part are added to those of the parts before it.
+    """
+    if processes is None:
+        processes = settings.THEWALL_PROCESSES
+    crew_counts = list(crew_counts)
+    sections = crew_sections(read_data, max(crew_counts, default=0))
+    # Every count above the number of sections is the same as that number.
+    counts = sorted({min(max(count, 0), len(sections)) for count in crew_counts})
+
+    size = -(-len(sections) // max(processes, 1)) or 1
+    starts = range(0, len(sections), size)
+    parts = [sections[start : start + size] for start in starts]
+    part_counts = [[count - start for count in counts if start < count <= start + size] for start in starts]
+
+    if processes > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(processes) as executor:
+            swept = list(executor.map(sweep_sections, parts, part_counts))
+    else:
+        swept = [sweep_sections(part, part_count) for part, part_count in zip(parts, part_counts)]
+
+    at = {0: (0, 0)}  # at = {count of sections: (completion day, feet built)}
+    day = feet = 0
+    for start, part_count, (results, part_day, part_feet) in zip(starts, part_counts, swept):
+        for count, (count_day, count_feet) in zip(part_count, results):
+            at[start + count] = max(day, count_day), feet + count_feet
+        day, feet = max(day, part_day), feet + part_feet
+
+    return [(count, *at[min(max(count, 0), len(sections))]) for count in crew_counts]
@@ -1,6 +1,60 @@
-from django.test import TestCase
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+import csv
+import datetime
+import io
 import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models import F
+from django.forms import ValidationError
+
+from thewall import renderers
+from thewall.export import BINARY_FIELDS, DAY_FIELDS, read_binary
+from thewall.jobs import get_job
+from thewall.logs import QueuedFileHandler
+from thewall.models import ACTIVE_DATASET, ActiveDataset, Dataset, Day, DayTotal, ProfileProgress
+from thewall.renderers import FastJSONRenderer
+from thewall.sweep import crew_sweep, parse_crew_counts
+from thewall.upload import (
+    clear_result_cache,
+    handle_upload_data,
+    iter_profiles,
+    multi_thread_days,
+    multi_thread_days_literal,
+    multi_thread_progress,
+    save_days,
+    single_thread_days,
+    single_thread_days_literal,
+    single_thread_progress,
+    single_thread_progress_parallel,
+)
+
+
+def day_rows(data):
+    return [(d.profile_no, d.day_no, d.current_feet_done, d.total_feet_done) for d in data]
+
+
+def upload(client, content, workers=-1, **fields):
+    """Post the content as an uploaded file, with the given workers and other form fields."""
+    return client.post(
+        "/profiles/upload/",
+        {"file_uploaded": SimpleUploadedFile("file_uploaded", content), "workers": workers, **fields},
+        format="multipart",
+    )
+
+
+def active_days():
+    return Day.objects.filter(dataset__activedataset__pk=ACTIVE_DATASET)
 
 
 class TestAPIRoot(TestCase):
@@ -48,6 +102,18 @@ class TestAPIUpload(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.content, b'"File upload successful!"')
 
+    def test_upload_file_literal(self):
+        with open("sample_input.txt", "rb") as file:
+            uploaded_file = SimpleUploadedFile("file_uploaded", file.read())
+
+        response = self.client.post(
+            "/profiles/upload/",
+            {"file_uploaded": uploaded_file, "workers": 5, "mode": "literal"},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'"File upload successful!"')
+
     def test_upload_post_no_file(self):
         response = self.client.post("/profiles/upload/")
         self.assertEqual(response.status_code, 400)
@@ -56,6 +122,27 @@ class TestAPIUpload(TestCase):
             b'"File upload failed: No file uploaded!"',
         )
 
+    def test_upload_file_invalid_segment(self):
+        uploaded_file = SimpleUploadedFile("file_uploaded", b"21 25 28\n17 31\n")
+
+        response = self.client.post(
+            "/profiles/upload/",
+            {"file_uploaded": uploaded_file},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.content,
+            b'"File upload failed: Line 2, column 4: A segment must have initial value between 0 and 30"',
+        )
+
+    def test_upload_file_blank_line(self):
+        uploaded_file = SimpleUploadedFile("file_uploaded", b"21 25 28\n\n17\n")
+
+        response = self.client.post("/profiles/upload/", {"file_uploaded": uploaded_file}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(ProfileProgress.objects.values_list("profile_no", flat=True)), [1, 3])
+
     def test_upload_post_no_workers(self):
         with open("sample_input.txt", "rb") as file:
             uploaded_file = SimpleUploadedFile("file_uploaded", file.read())
@@ -96,6 +183,19 @@ class TestAPIProfilesSingleThread(TestCase):
             {"day": 1, "cost": 3334500},
         )
 
+    def test_overview_finished_profile(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/profiles/overview/10/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            {"day": 10, "cost": 27417000},
+        )
+
+    def test_overview_after_last_day(self):
+        response = self.client.get("/profiles/overview/14/")
+        self.assertEqual(response.status_code, 404)
+
     def test_overview_day_1_profile_1(self):
         response = self.client.get("/profiles/1/overview/1/")
         self.assertEqual(response.status_code, 200)
@@ -112,6 +212,50 @@ class TestAPIProfilesSingleThread(TestCase):
             {"day": 1, "ice_amount": 585},
         )
 
+    def test_profile_1_series(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/profiles/1/series/?from=2&to=4")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            {"day": [2, 3, 4], "ice_amount": [585, 390, 390], "cost": [2223000, 2964000, 3705000]},
+        )
+
+    def test_profile_series_not_found(self):
+        response = self.client.get("/profiles/4/series/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_1_after_completion(self):
+        response = self.client.get("/profiles/1/days/10/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_completion(self):
+        response = self.client.get("/profiles/completion/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": 13, "ice_amount": 16965, "cost": 32233500})
+
+    def test_profile_1_completion(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/profiles/1/completion/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": 9, "ice_amount": 3120, "cost": 5928000})
+
+    def test_profile_1_forecast(self):
+        response = self.client.get("/profiles/1/forecast/2/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content), {"day": 2, "ice_amount": 585, "cost": 2223000, "completed": False}
+        )
+
+    def test_profile_1_forecast_after_completion(self):
+        response = self.client.get("/profiles/1/forecast/12/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": 12, "ice_amount": 0, "cost": 5928000, "completed": True})
+
+    def test_forecast_not_found(self):
+        self.assertEqual(self.client.get("/profiles/4/forecast/1/").status_code, 404)
+        self.assertEqual(self.client.get("/profiles/1/forecast/0/").status_code, 404)
+
 
 class TestAPIProfilesMultiThread(TestAPIProfilesSingleThread):
     def setUp(self) -> None:
@@ -139,3 +283,728 @@ class TestAPIProfilesMultiThread(TestAPIProfilesSingleThread):
             json.loads(response.content),
             {"day": None, "cost": 15561000},
         )
+
+    def test_overview_finished_profile(self):
+        response = self.client.get("/profiles/overview/10/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            {"day": 10, "cost": 13338000},
+        )
+
+    def test_completion(self):
+        response = self.client.get("/profiles/completion/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": 13, "ice_amount": 8190, "cost": 15561000})
+
+
+@override_settings(THEWALL_STORAGE="compact")
+class TestAPIProfilesCompact(TestAPIProfilesSingleThread):
+    def test_storage(self):
+        self.assertEqual(Day.objects.count(), 0)
+        self.assertEqual(
+            list(ProfileProgress.objects.order_by("profile_no").values_list("profile_no", "daily_feet")),
+            [(1, [3, 3, 2, 2, 2, 1, 1, 1, 1]), (2, [1] * 13), (3, [5] * 8 + [4] * 3 + [3] * 2)],
+        )
+
+    def test_profile_1_series_before_day_1(self):
+        response = self.client.get("/profiles/1/series/?to=-1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": [], "ice_amount": [], "cost": []})
+
+    def test_profile_1_day_9_cost(self):
+        response = self.client.get("/profiles/1/overview/9/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": 9, "cost": 5928000})
+
+
+class TestAPIUploadProfiles(TestCase):
+    def stored(self):
+        dataset = ActiveDataset.objects.get(pk=ACTIVE_DATASET).dataset
+        return (
+            day_rows(dataset.day_set.order_by("profile_no", "day_no")),
+            list(dataset.daytotal_set.order_by("day_no").values_list("day_no", "current_feet_done", "total_feet_done")),
+            list(dataset.profileprogress_set.order_by("profile_no").values_list("profile_no", "daily_feet")),
+        )
+
+    def assertStored(self, content):
+        """Check the stored days are the same as those of a full upload of the given content."""
+        stored = self.stored()
+        upload(self.client, content)
+        self.assertEqual(stored, self.stored())
+
+    def test_replace_profiles(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        response = upload(self.client, b"28 29\n30\n", profiles="3,2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'"File upload successful!"')
+        self.assertStored(b"21 25 28\n30\n28 29")
+
+    def test_append_profiles(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        response = upload(self.client, b"0\n29 29", offset=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertStored(b"21 25 28\n17\n17 22 17 19 17\n0\n29 29")
+
+    def test_replace_profiles_literal(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        response = upload(self.client, b"30\n28", profiles="2,3", mode="literal")
+        self.assertEqual(response.status_code, 200)
+        self.assertStored(b"21 25 28\n30\n28")
+
+    def test_append_profiles_literal(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        response = upload(self.client, b"30\n28", offset=1, mode="literal")
+        self.assertEqual(response.status_code, 200)
+        self.assertStored(b"21 25 28\n30\n28")
+
+    def test_multi_thread(self):
+        response = upload(self.client, b"28 29", profiles="1", workers=5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.content,
+            b'"File upload failed: Only the profiles of an upload with a crew per section can be replaced"',
+        )
+
+    def test_missing_profile_numbers(self):
+        upload(self.client, b"21 25 28\n17")
+        response = upload(self.client, b"28 29\n30", profiles="2")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.content,
+            b'"File upload failed: The file has more profiles than profile numbers given"',
+        )
+        self.assertStored(b"21 25 28\n17")
+
+
+class TestAPIUploadRepeated(TestCase):
+    def setUp(self) -> None:
+        clear_result_cache()
+
+    def upload_logs(self, content, workers=-1):
+        with self.assertLogs("django_log", "INFO") as logs:
+            response = upload(self.client, content, workers)
+        self.assertEqual(response.status_code, 200)
+        return "\n".join(logs.output)
+
+    def test_already_stored(self):
+        self.upload_logs(b"21 25 28\n17\n17 22 17 19 17")
+        days = list(Day.objects.values_list("id", flat=True))
+        self.assertRegex(self.upload_logs(b"21 25 28\n17\n17 22 17 19 17"), r"Upload \w+ is already stored")
+        self.assertEqual(list(Day.objects.values_list("id", flat=True)), days)
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_cached(self):
+        self.upload_logs(b"21 25 28\n17\n17 22 17 19 17", workers=5)
+        self.upload_logs(b"21 25 28\n17\n17 22 17 19 17")
+        self.assertRegex(
+            self.upload_logs(b"21 25 28\n17\n17 22 17 19 17", workers=5), r"Upload \w+ is taken from the cache"
+        )
+        response = self.client.get("/profiles/overview/")
+        self.assertEqual(json.loads(response.content), {"day": None, "cost": 15561000})
+
+    def test_replaced_profiles(self):
+        self.upload_logs(b"21 25 28\n17\n17 22 17 19 17")
+        self.client.post(
+            "/profiles/upload/",
+            {"file_uploaded": SimpleUploadedFile("file_uploaded", b"29"), "profiles": "2"},
+            format="multipart",
+        )
+        self.assertRegex(self.upload_logs(b"21 25 28\n17\n17 22 17 19 17"), r"Upload \w+ is taken from the cache")
+        response = self.client.get("/profiles/overview/")
+        self.assertEqual(json.loads(response.content), {"day": None, "cost": 32233500})
+
+
+class TestAPIDatasets(TestCase):
+    def upload_dataset(self, content):
+        self.assertEqual(upload(self.client, content).status_code, 200)
+        return ActiveDataset.objects.get(pk=ACTIVE_DATASET).dataset_id
+
+    def get(self, url):
+        response = self.client.get(url)
+        return response.status_code, json.loads(response.content)
+
+    def test_switch(self):
+        first = self.upload_dataset(b"21 25 28\n17\n17 22 17 19 17")
+        second = self.upload_dataset(b"29 29")
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.get("/profiles/overview/"), (200, {"day": None, "cost": 741000}))
+        self.assertEqual(self.get(f"/profiles/overview/?dataset={first}"), (200, {"day": None, "cost": 32233500}))
+        self.assertEqual(self.get(f"/profiles/1/days/1/?dataset={first}"), (200, {"day": 1, "ice_amount": 585}))
+        self.assertEqual(self.get("/profiles/2/days/1/")[0], 404)
+
+        status_code, datasets = self.get("/profiles/datasets/")
+        self.assertEqual([(d["id"], d["active"]) for d in datasets], [(second, True), (first, False)])
+
+        response = self.client.post(f"/profiles/datasets/{first}/activate/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get("/profiles/overview/"), (200, {"day": None, "cost": 32233500}))
+
+    def test_unknown_dataset(self):
+        self.upload_dataset(b"29 29")
+        self.assertEqual(self.get("/profiles/1/days/1/?dataset=1000")[0], 404)
+        self.assertEqual(self.get("/profiles/1/days/1/?dataset=x")[0], 404)
+        self.assertEqual(self.client.post("/profiles/datasets/1000/activate/").status_code, 404)
+
+    @override_settings(THEWALL_DATASETS_KEPT=1)
+    def test_old_datasets_deleted(self):
+        datasets = [self.upload_dataset(content) for content in (b"29", b"28", b"27", b"26")]
+        self.assertEqual(list(Dataset.objects.order_by("id").values_list("id", flat=True)), datasets[2:])
+        self.assertEqual(Day.objects.count(), 3 + 4)
+
+
+class TestAPIRaw(TestCase):
+    def setUp(self) -> None:
+        with open("sample_input.txt", "rb") as file:
+            uploaded_file = SimpleUploadedFile("file_uploaded", file.read())
+
+        self.client.post(
+            "/profiles/upload/",
+            {"file_uploaded": uploaded_file},
+            format="multipart",
+        )
+        self.days = list(active_days().order_by("profile_no", "day_no").values(*DAY_FIELDS))
+
+    def test_pages(self):
+        days = []
+        url = "/profiles/raw/?page_size=10"
+        while url:
+            with self.assertNumQueries(2):
+                response = json.loads(self.client.get(url).content)
+            self.assertLessEqual(len(response["results"]), 10)
+            days.extend(response["results"])
+            url = response["next"]
+        self.assertEqual(days, self.days)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/profiles/raw/?cursor=x")
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream(self):
+        response = self.client.get("/profiles/raw/stream/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), self.days)
+
+    def test_export_csv(self):
+        response = self.client.get("/profiles/export/csv/")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([{name: int(value) for name, value in row.items()} for row in rows], self.days)
+
+    def test_export_ndjson(self):
+        response = self.client.get("/profiles/export/ndjson/")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.days)
+
+    def test_export_binary(self):
+        response = self.client.get("/profiles/export/bin/")
+        rows = list(read_binary(io.BytesIO(b"".join(response.streaming_content))))
+        self.assertEqual(rows, [tuple(day[name] for name in BINARY_FIELDS) for day in self.days])
+
+    def test_export_unknown_format(self):
+        response = self.client.get("/profiles/export/xml/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "days.ndjson")
+            call_command("export_days", format="ndjson", output=path)
+            with open(path) as file:
+                self.assertEqual([json.loads(line) for line in file], self.days)
+
+
+class TestAPIBatch(TestCase):
+    def setUp(self) -> None:
+        with open("sample_input.txt", "rb") as file:
+            uploaded_file = SimpleUploadedFile("file_uploaded", file.read())
+
+        self.client.post(
+            "/profiles/upload/",
+            {"file_uploaded": uploaded_file},
+            format="multipart",
+        )
+
+    def test_batch(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                "/profiles/batch/",
+                {"queries": [[1, 1, "ice"], [1, 1, "cost"], [3, 13, "cost"], [1, 10, "ice"], [4, 1, "ice"]]},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), [585, 1111500, 21489000, None, None])
+
+    def test_invalid_query(self):
+        response = self.client.post(
+            "/profiles/batch/",
+            {"queries": [[1, 1, "ice"], [1, "x", "ice"]]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.content,
+            b'"Batch query failed: [1, \'x\', \'ice\'] is not a [profile_no, day_no, \\"ice\\" or \\"cost\\"] query!"',
+        )
+
+
+@override_settings(THEWALL_STORAGE="compact")
+class TestAPIBatchCompact(TestAPIBatch):
+    pass
+
+
+class TestAPISweep(TestCase):
+    def test_sweep(self):
+        with open("sample_input.txt", "rb") as file:
+            uploaded_file = SimpleUploadedFile("file_uploaded", file.read())
+        response = self.client.post("/profiles/sweep/", {"file_uploaded": uploaded_file, "workers": "1,5,100"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            [
+                {"workers": 1, "day": 9, "ice_amount": 1755, "cost": 3334500},
+                {"workers": 5, "day": 13, "ice_amount": 8190, "cost": 15561000},
+                {"workers": 100, "day": 13, "ice_amount": 16965, "cost": 32233500},
+            ],
+        )
+        self.assertEqual(Dataset.objects.count(), 0)
+
+    def test_bad_crew_counts(self):
+        uploaded_file = SimpleUploadedFile("file_uploaded", b"21 25 28")
+        response = self.client.post("/profiles/sweep/", {"file_uploaded": uploaded_file, "workers": "0-3"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), "Sweep failed: Crew counts: Counts and steps must be at least 1")
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("sweep", "sample_input.txt", workers="5", processes=2, stdout=out)
+        self.assertEqual(json.loads(out.getvalue()), [{"workers": 5, "day": 13, "ice_amount": 8190, "cost": 15561000}])
+
+
+class TestAPICache(TestCase):
+    def test_cached(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        response = self.client.get("/profiles/1/overview/1/")
+        # Only the version of the stored data is read.
+        with self.assertNumQueries(1):
+            cached = self.client.get("/profiles/1/overview/1/")
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(json.loads(cached.content), json.loads(response.content))
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+    def test_not_modified(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        etag = self.client.get("/profiles/overview/")["ETag"]
+        # Only the version of the stored data is read.
+        with self.assertNumQueries(1):
+            response = self.client.get("/profiles/overview/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_upload_invalidates(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        etag = self.client.get("/profiles/overview/")["ETag"]
+        upload(self.client, b"29")
+        response = self.client.get("/profiles/overview/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": None, "cost": 370500})
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_cache_cleared_between_uploads(self):
+        # As after a restart of the process, or in another process than the one that handled the upload.
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        caches["thewall"].clear()
+        etag = self.client.get("/profiles/overview/")["ETag"]
+        upload(self.client, b"29")
+        caches["thewall"].clear()
+        response = self.client.get("/profiles/overview/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"day": None, "cost": 370500})
+
+    def test_changed_by_another_process(self):
+        upload(self.client, b"21 25 28\n17\n17 22 17 19 17")
+        etag = self.client.get("/profiles/overview/")["ETag"]
+        # Only the database knows of a change made by another process.
+        ActiveDataset.objects.filter(pk=ACTIVE_DATASET).update(revision=F("revision") + 1)
+        with self.assertNumQueries(2):
+            response = self.client.get("/profiles/overview/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class TestAPIAsync(TestCase):
+    def setUp(self) -> None:
+        with open("sample_input.txt", "rb") as file:
+            uploaded_file = SimpleUploadedFile("file_uploaded", file.read())
+        self.client.post("/profiles/upload/", {"file_uploaded": uploaded_file}, format="multipart")
+
+    def test_same_as_sync(self):
+        for path in (
+            "profiles/1/days/1/",
+            "profiles/2/overview/13/",
+            "profiles/overview/2/",
+            "profiles/overview/",
+            "profiles/9/days/1/",
+            "profiles/overview/100/",
+        ):
+            response = self.client.get(f"/{path}")
+            async_response = self.client.get(f"/async/{path}")
+            self.assertEqual(async_response.status_code, response.status_code, path)
+            self.assertEqual(json.loads(async_response.content), json.loads(response.content), path)
+
+    def test_not_modified(self):
+        etag = self.client.get("/async/profiles/1/overview/2/")["ETag"]
+        # Only the version of the stored data is read.
+        with self.assertNumQueries(1):
+            response = self.client.get("/async/profiles/1/overview/2/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_async_client(self):
+        response = await self.async_client.get("/async/profiles/1/days/2/")
+        self.assertEqual(json.loads(response.content), {"day": 2, "ice_amount": 585})
+        response = await self.async_client.post("/async/profiles/1/days/2/")
+        self.assertEqual(response.status_code, 405)
+
+
+class TestLoadtest(LiveServerTestCase):
+    def test_command(self):
+        with open("sample_input.txt", "rb") as file:
+            handle_upload_data(SimpleUploadedFile("file_uploaded", file.read()), -1)
+        out = io.StringIO()
+        call_command(
+            "loadtest",
+            f"sync={self.live_server_url}/",
+            f"async={self.live_server_url}/async/",
+            concurrency=3,
+            requests=12,
+            stdout=out,
+            stderr=io.StringIO(),
+        )
+        results = json.loads(out.getvalue())
+        for name in ("sync", "async"):
+            self.assertEqual(results[name]["requests"], 12)
+            self.assertEqual(results[name]["errors"], 0)
+            self.assertGreater(results[name]["requests_per_second"], 0)
+
+
+class TestSingleThreadEngine(SimpleTestCase):
+    def test_sample_input(self):
+        read_data = [[9, 5, 2], [13], [13, 8, 13, 11, 13]]
+        self.assertEqual(
+            day_rows(single_thread_days(read_data)),
+            day_rows(single_thread_days_literal(read_data)),
+        )
+
+    def test_matches_literal_simulation(self):
+        rng = random.Random(30)
+        for _ in range(50):
+            read_data = [[rng.randint(0, 30) for _ in range(rng.randint(1, 200))] for _ in range(rng.randint(1, 10))]
+            self.assertEqual(
+                day_rows(single_thread_days(read_data)),
+                day_rows(single_thread_days_literal(read_data)),
+            )
+
+    def test_completed_profile(self):
+        self.assertEqual(list(single_thread_days([[0, 0, 0]])), [])
+
+    def test_empty_profile(self):
+        read_data = [[9, 5], [], [2]]
+        self.assertEqual(
+            list(single_thread_progress(read_data)), [(1, [2, 2, 2, 2, 2, 1, 1, 1, 1]), (2, []), (3, [1, 1])]
+        )
+        self.assertEqual(day_rows(single_thread_days(read_data)), day_rows(single_thread_days_literal(read_data)))
+
+    def test_parallel(self):
+        rng = random.Random(30)
+        read_data = [[rng.randint(0, 30) for _ in range(rng.randint(1, 200))] for _ in range(100)]
+        self.assertEqual(
+            list(single_thread_progress_parallel(read_data, processes=3, chunk_size=7)),
+            list(single_thread_progress(read_data)),
+        )
+
+    def test_parallel_spawn(self):
+        # Processes that are not forked must be able to run the work without Django being set up.
+        spawn = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn"))
+        read_data = [[9, 5, 2], [13], [13, 8, 13, 11, 13]]
+        with mock.patch("thewall.upload.ProcessPoolExecutor", spawn):
+            progress = list(single_thread_progress_parallel(read_data, processes=2, chunk_size=1))
+        self.assertEqual(progress, list(single_thread_progress(read_data)))
+
+
+class TestMultiThreadEngine(SimpleTestCase):
+    def simulate(self, engine, read_data, workers):
+        with self.assertLogs("django_log", "INFO") as logs:
+            data = engine(read_data, workers)
+        return day_rows(data), logs.output
+
+    def test_sample_input(self):
+        read_data = [[9, 5, 2], [13], [13, 8, 13, 11, 13]]
+        for workers in (1, 5, 20):
+            self.assertEqual(
+                self.simulate(multi_thread_days, read_data, workers),
+                self.simulate(multi_thread_days_literal, read_data, workers),
+            )
+
+    def test_matches_literal_simulation(self):
+        rng = random.Random(30)
+        for _ in range(10):
+            read_data = [[rng.randint(0, 30) for _ in range(rng.randint(1, 20))] for _ in range(rng.randint(1, 5))]
+            workers = rng.randint(0, 40)
+            self.assertEqual(
+                self.simulate(multi_thread_days, read_data, workers),
+                self.simulate(multi_thread_days_literal, read_data, workers),
+            )
+
+    def test_worker_log(self):
+        with self.assertLogs("django_log", "INFO") as logs:
+            multi_thread_days([[1, 2]], 3)
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            [
+                "Avaliable workers 3.",
+                "Day: 1",
+                "Worker #1 works on Profile 1, Section 1",
+                "Worker #2 works on Profile 1, Section 2",
+                "Worker #3 got no job today and is relieved",
+                "Day: 2",
+                "Worker #1 works on Profile 1, Section 2",
+                "Worker #2 got no job today and is relieved",
+                "Worker #3 got no job today and is relieved",
+            ],
+        )
+
+    def test_no_workers(self):
+        self.assertEqual(
+            self.simulate(multi_thread_days, [[1, 2]], 0),
+            self.simulate(multi_thread_days_literal, [[1, 2]], 0),
+        )
+
+    @override_settings(THEWALL_WORKER_LOG="sampled", THEWALL_WORKER_LOG_SAMPLE=2)
+    def test_sampled_worker_log(self):
+        with self.assertLogs("django_log", "INFO") as logs:
+            multi_thread_days([[1, 2]], 3)
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            [
+                "Avaliable workers 3.",
+                "Day: 1",
+                "Worker #1 works on Profile 1, Section 1",
+                "Worker #3 got no job today and is relieved",
+                "Workers working today: 2, relieved: 1",
+                "Day: 2",
+                "Worker #1 works on Profile 1, Section 2",
+                "Worker #3 got no job today and is relieved",
+                "Workers working today: 1, relieved: 2",
+            ],
+        )
+
+    @override_settings(THEWALL_WORKER_LOG="summary")
+    def test_summary_worker_log(self):
+        read_data = [[9, 5, 2], [13], [13, 8, 13, 11, 13]]
+        for workers in (1, 5, 20):
+            simulated = self.simulate(multi_thread_days, read_data, workers)
+            self.assertEqual(simulated, self.simulate(multi_thread_days_literal, read_data, workers))
+            self.assertFalse(any("Worker #" in line for line in simulated[1]))
+
+
+class TestCrewSweep(SimpleTestCase):
+    def test_same_as_multi_thread(self):
+        rnd = random.Random(0)
+        read_data = [[rnd.randint(0, 30) for _ in range(rnd.randint(0, 20))] for _ in range(30)]
+        crew_counts = [1, 2, 3, 50, 51, 200, 1000]
+        expected = []
+        for workers in crew_counts:
+            progress = multi_thread_progress(read_data, workers)
+            expected.append(
+                (workers, max(len(daily_feet) for _, daily_feet in progress), sum(sum(x) for _, x in progress))
+            )
+        with self.assertNoLogs("django_log"):
+            self.assertEqual(crew_sweep(read_data, crew_counts, processes=1), expected)
+            self.assertEqual(crew_sweep(read_data, crew_counts, processes=3), expected)
+
+    def test_spawn(self):
+        spawn = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn"))
+        read_data = [[9, 5, 2], [13], [13, 8, 13, 11, 13]]
+        with mock.patch("thewall.sweep.ProcessPoolExecutor", spawn):
+            self.assertEqual(
+                crew_sweep(read_data, [1, 5, 9], processes=2), crew_sweep(read_data, [1, 5, 9], processes=1)
+            )
+
+    def test_parse_crew_counts(self):
+        self.assertEqual(parse_crew_counts("5,1-3,10-30:10,2"), [1, 2, 3, 5, 10, 20, 30])
+        for spec in ("", "a", "0-3", "1-5:0", "1-1000000"):
+            with self.assertRaises(ValidationError):
+                parse_crew_counts(spec)
+
+
+class TestQueuedFileHandler(SimpleTestCase):
+    def test_writes_records(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "info.log")
+            handler = QueuedFileHandler(filename)
+            logger = logging.getLogger("thewall.tests.queued")
+            logger.addHandler(handler)
+            # Only to the file, not to the console as well.
+            logger.propagate = False
+            try:
+                for day in range(1, 1001):
+                    logger.warning(f"Day: {day}")
+            finally:
+                logger.propagate = True
+                logger.removeHandler(handler)
+                handler.close()
+            with open(filename) as file:
+                lines = file.read().splitlines()
+        self.assertEqual(lines, [f"Day: {day}" for day in range(1, 1001)])
+
+
+class TestSaveDays(TestCase):
+    def test_replaces_days(self):
+        save_days(single_thread_days([[9, 5, 2], [13]]))
+        with self.assertLogs("django_log", "INFO") as logs:
+            save_days(single_thread_days([[1, 2]]), batch_size=1)
+        self.assertEqual(
+            day_rows(active_days().order_by("id")),
+            [(1, 1, 2, 2), (1, 2, 1, 3)],
+        )
+        self.assertRegex(logs.output[-1], r"Saved 3 rows in .*s \(\d+ rows/s\)")
+
+
+class TestParser(SimpleTestCase):
+    def parse(self, content, chunk_size=None):
+        return list(iter_profiles(SimpleUploadedFile("file_uploaded", content), chunk_size))
+
+    def test_sample_input(self):
+        with open("sample_input.txt", "rb") as file:
+            content = file.read()
+        self.assertEqual(self.parse(content), [[9, 5, 2], [13], [13, 8, 13, 11, 13]])
+
+    def test_chunks(self):
+        content = "\n".join(" ".join(str(i % 31) for i in range(n, n + 40)) for n in range(20)).encode()
+        self.assertEqual(self.parse(content, chunk_size=7), self.parse(content))
+
+    def test_blank_lines(self):
+        self.assertEqual(self.parse(b"\n \n21 25\r\n\n17\n\n"), [[9, 5], [], [13]])
+
+    def test_invalid_segment(self):
+        with self.assertRaisesMessage(ValidationError, "Line 3, column 6: A segment must be a whole number"):
+            self.parse(b"1\n2\n3 4  x5 6\n")
+
+    def test_too_many_segments(self):
+        with self.assertRaisesMessage(
+            ValidationError, "Line 1, column 4001: A profile cannot have more than 2000 segments"
+        ):
+            self.parse(b"0 " * 2001)
+
+
+class TestAPIUploadJob(TransactionTestCase):
+    def setUp(self) -> None:
+        clear_result_cache()
+
+    def upload_job(self, content):
+        response = upload(self.client, content, **{"async": "true"})
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.content)["id"]
+        self.assertTrue(get_job(job_id).wait(10))
+        return self.client.get(f"/profiles/upload/{job_id}/")
+
+    def test_upload_file(self):
+        with open("sample_input.txt", "rb") as file:
+            response = self.upload_job(file.read())
+        self.assertEqual(response.status_code, 200)
+        job = json.loads(response.content)
+        self.assertEqual(job["state"], "done")
+        self.assertEqual(job["profiles"], 3)
+        self.assertIsNone(job["error"])
+        self.assertGreaterEqual(job["timings"]["running"], 0)
+        self.assertEqual(job["stages"]["counts"]["profiles"], 3)
+        self.assertEqual(Day.objects.count(), 35)
+
+    def test_upload_invalid_file(self):
+        response = self.upload_job(b"21 25 x")
+        job = json.loads(response.content)
+        self.assertEqual(job["state"], "failed")
+        self.assertEqual(job["error"], "File upload failed: Line 1, column 7: A segment must be a whole number")
+
+    def test_unknown_job(self):
+        response = self.client.get("/profiles/upload/unknown/")
+        self.assertEqual(response.status_code, 404)
+
+
+class TestAPIMetrics(TestCase):
+    def setUp(self) -> None:
+        clear_result_cache()
+
+    def test_server_timing(self):
+        with open("sample_input.txt", "rb") as file:
+            response = upload(self.client, file.read())
+        self.assertEqual(response.status_code, 200)
+        stages = [timing.split(";")[0] for timing in response["Server-Timing"].split(", ")]
+        for name in ("parse", "hash", "simulate", "rows", "insert", "totals", "total"):
+            self.assertIn(name, stages)
+
+    def test_failed_upload(self):
+        response = upload(self.client, b"21 25 x")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("Server-Timing", response)
+
+    def test_metrics(self):
+        with open("sample_input.txt", "rb") as file:
+            upload(self.client, file.read())
+        upload(self.client, b"21 25 x")
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn("# TYPE thewall_uploads_total counter", text)
+        self.assertIn('thewall_uploads_total{result="failure"} ', text)
+        self.assertIn('thewall_upload_stage_seconds_total{stage="parse"} ', text)
+        self.assertIn('thewall_upload_stage_queries_total{stage="totals"} ', text)
+        self.assertIn("thewall_upload_bytes_read_total ", text)
+
+
+class TestBenchDayLookups(TestCase):
+    def test_command(self):
+        out = io.StringIO()
+        call_command("bench_day_lookups", profiles=20, sections=10, requests=5, stdout=out)
+        self.assertIn("USING INDEX day_dataset_profile_day_idx", out.getvalue())
+        self.assertEqual(Day.objects.count(), 0)
+
+
+class TestBenchRender(TestCase):
+    def test_command(self):
+        out = io.StringIO()
+        call_command("bench_render", profiles=20, sections=10, requests=5, stdout=out)
+        self.assertIn("ice, serializer", out.getvalue())
+        self.assertEqual(Day.objects.count(), 0)
+
+
+class TestFastJSONRenderer(SimpleTestCase):
+    data = {"day": 1, "ice_amount": 195, "name": "Nöel", "at": datetime.datetime(2022, 2, 1, 12, 0)}
+
+    def test_compact(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            '{"day":1,"ice_amount":195,"name":"Nöel","at":"2022-02-01T12:00:00"}'.encode(),
+        )
+
+    def test_indent(self):
+        data = {"day": 1, "ice_amount": 195}
+        indented = '{\n    "day": 1,\n    "ice_amount": 195\n}'.encode()
+        self.assertEqual(FastJSONRenderer().render(data, "application/json; indent=4"), indented)
+        self.assertEqual(FastJSONRenderer().render(data, "application/json", {"indent": 4}), indented)
+
+    def test_without_orjson(self):
+        with mock.patch("thewall.renderers.orjson", None):
+            self.assertEqual(FastJSONRenderer().render(self.data), renderers.dumps(self.data))
+
+
+class TestBenchmark(TestCase):
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "benchmark.json")
+            call_command("benchmark", scales="5x5x-1,5x5x3", requests=2, literal=True, output=path)
+            with open(path) as file:
+                results = json.load(file)
+        self.assertEqual([(run["profiles"], run["workers"]) for run in results["runs"]], [(5, -1), (5, 3)])
+        self.assertEqual(list(results["runs"][1]["stages"]), ["parse", "simulate", "simulate_literal", "persist"])
+        self.assertEqual(len(results["runs"][0]["queries"]), 4)
+        self.assertEqual(Day.objects.count(), 0)
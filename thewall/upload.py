@@ -1,92 +1,349 @@
+import codecs
+import hashlib
 import logging
+import queue
+import re
 import threading
-from collections import deque
-from multiprocessing import Lock
-from typing import List
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, groupby, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
 from django.forms import ValidationError
 from django.core.files.uploadedfile import UploadedFile
-from thewall.models import Day
+from thewall import metrics
+from thewall.models import ACTIVE_DATASET, ActiveDataset, Dataset, Day, DayTotal, ProfileProgress
+from thewall.progress import profile_daily_feet
 
 log = logging.getLogger("django_log")
 
+Progress = Tuple[int, List[int]]  # (profile number, feet done on each day starting from day 1)
 
-def handle_upload_data(uploaded_file, workers) -> None:
-    """Entry point for handling an uploaded file."""
-    read_data = parse_data(uploaded_file)
 
-    if workers == -1:
-        # Single-threaded version
-        work_single_thread(read_data)
+def handle_upload_data(
+    uploaded_file, workers, literal=False, on_profile=None, offset=None, profile_numbers=None
+) -> metrics.UploadMetrics:
+    """Entry point for handling an uploaded file, returns the metrics of its stages.
+    With `literal` the work is simulated day by day (and thread by thread) instead of being scheduled upfront.
+    `on_profile` is called with the number of profiles read so far.
+    With `offset` or `profile_numbers` only the profiles of the file are replaced, the other stored profiles
+    are kept. The profiles of the file are stored after `offset`, or under the given `profile_numbers`.
+    """
+    with metrics.record_upload() as upload_metrics:
+        process_upload_data(uploaded_file, workers, literal, on_profile, offset, profile_numbers)
+    return upload_metrics
+
+
+def process_upload_data(uploaded_file, workers, literal, on_profile, offset, profile_numbers) -> None:
+    read_data = metrics.iter_stage("parse", iter_profiles(uploaded_file))
+    if on_profile is not None:
+        read_data = report_progress(read_data, on_profile)
+
+    if offset is not None or profile_numbers is not None:
+        if workers != -1:
+            raise ValidationError("Only the profiles of an upload with a crew per section can be replaced")
+        if literal:
+            progress = metrics.iter_stage("simulate", single_thread_progress_literal(read_data))
+        else:
+            progress = metrics.iter_stage("simulate", single_thread_progress_parallel(read_data))
+        update_progress(renumber_progress(progress, offset or 0, profile_numbers))
+    elif literal:
+        if workers == -1:
+            work_single_thread(read_data, literal)
+        else:
+            work_multi_thread(read_data, workers, literal)
     else:
-        # Multi-threaded version
-        work_multi_thread(read_data, workers)
+        # The result of a file is the same every time it is uploaded with the same workers.
+        with metrics.stage("hash"):
+            digest = upload_digest(uploaded_file, workers)
+        if stored_digest() == digest:
+            log.info(f"Upload {digest} is already stored")
+            return
+
+        progress = cached_progress(digest)
+        if progress is not None:
+            log.info(f"Upload {digest} is taken from the cache")
+            save_progress(progress, digest=digest)
+            return
+
+        if workers == -1:
+            # Single-threaded version
+            computed = metrics.iter_stage("simulate", single_thread_progress_parallel(read_data))
+        else:
+            # Multi-threaded version
+            with metrics.stage("simulate"):
+                computed = multi_thread_progress(read_data, workers)
+        progress = []
+        save_progress(record_progress(computed, progress), digest=digest)
+        cache_progress(digest, progress)
+
+
+def upload_digest(uploaded_file: UploadedFile, workers: int) -> str:
+    """Return the hash of the uploaded file together with the number of workers."""
+    digest = hashlib.sha256(f"{workers}\n".encode())
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stored_digest() -> Optional[str]:
+    """Return the hash of the upload the active dataset comes from, if it is known."""
+    return ActiveDataset.objects.filter(pk=ACTIVE_DATASET).values_list("dataset__digest", flat=True).first()
+
+
+# The progress of the most recent uploads, THEWALL_RESULT_CACHE_SIZE at most, least recently used first.
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def cached_progress(digest: str) -> Optional[List[Progress]]:
+    with _results_lock:
+        if digest in _results:
+            _results.move_to_end(digest)
+        return _results.get(digest)
+
+
+def cache_progress(digest: str, progress: List[Progress]) -> None:
+    with _results_lock:
+        _results[digest] = progress
+        _results.move_to_end(digest)
+        while len(_results) > settings.THEWALL_RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+
+
+def clear_result_cache() -> None:
+    with _results_lock:
+        _results.clear()
+
+
+def record_progress(progress: Iterable[Progress], recorded: List[Progress]) -> Iterator[Progress]:
+    """Pass the progress through, appending it to `recorded`."""
+    for item in progress:
+        recorded.append(item)
+        yield item
 
 
 def parse_data(uploaded_file: UploadedFile) -> List[List[int]]:
     """Parse the uploaded file and return a list of profiles, each profile being a list of segments."""
-    raw_data = uploaded_file.read().decode("utf-8").strip().split("\n")
-
-    # Subtract the initial value from 30 to get the remaining height of the segment that must be build.
-    read_data = [[30 - int(x) for x in line.split()] for line in raw_data]
-    for lst in read_data:
-        if len(lst) > 2000:
-            raise ValidationError("A profile cannot have more than 2000 segments")
-        for elem in lst:
-            if not 0 <= elem <= 30:
-                raise ValidationError("A segment must have initial value between 0 and 30")
-    return read_data
-
-
-def work_multi_thread(read_data: List[List[int]], workers: int) -> None:
-    """Multi-threaded version of the work function.
-    Each thread is a worker that works on a segment of a profile.
+    return list(iter_profiles(uploaded_file))
+
+
+def iter_profiles(uploaded_file: UploadedFile, chunk_size: Optional[int] = None) -> Iterator[List[int]]:
+    """Parse the uploaded file chunk by chunk and yield the profiles one at a time,
+    each profile being a list of segments.
+    Blank lines at the start and the end of the file are ignored.
     """
-    work_queue = deque()
-    ready_queue = []
-    for prof_no in range(1, len(read_data) + 1):
-        for sec_no, section in enumerate(read_data[prof_no - 1], start=1):
-            work_queue.append([prof_no, sec_no, section])
+    blank_lines = 0  # blank lines are only profiles if another profile follows them
+    for line_no, line in enumerate(iter_lines(uploaded_file, chunk_size), start=1):
+        if not line.strip():
+            blank_lines += 1
+            continue
+        if blank_lines < line_no - 1:
+            for _ in range(blank_lines):
+                yield []
+        blank_lines = 0
+        metrics.count("profiles")
+        yield parse_profile(line, line_no)
 
-    get_work_lock = Lock()
-    profiles = {}  # profiles = {profile: {day: current_work}}
 
-    def work(worker_no, day):
-        """Worker function."""
+def report_progress(read_data: Iterable[List[int]], on_profile: Callable[[int], None]) -> Iterator[List[int]]:
+    """Pass the profiles through, reporting the number of profiles read so far."""
+    for count, profile in enumerate(read_data, start=1):
+        yield profile
+        on_profile(count)
 
-        # Get work
-        if work_queue:
-            with get_work_lock:
-                prof_no, sec_no, section = work_queue.popleft()
-                profiles[prof_no] = profiles.get(prof_no, {day: 0})
-        else:
-            log.info(f"Worker #{worker_no} got no job today and is relieved")
-            return
 
-        log.info(f"Worker #{worker_no} works on Profile {prof_no}, Section {sec_no}")
-        section -= 1
+def iter_lines(uploaded_file: UploadedFile, chunk_size: Optional[int] = None) -> Iterator[str]:
+    """Decode the uploaded file chunk by chunk and yield its lines."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = []  # start of a line that continues in the next chunk
+    for chunk in uploaded_file.chunks(chunk_size):
+        metrics.count("bytes_read", len(chunk))
+        *lines, rest = decoder.decode(chunk).split("\n")
+        if lines:
+            lines[0] = "".join(pending) + lines[0]
+            pending = []
+            yield from lines
+        pending.append(rest)
+    pending.append(decoder.decode(b"", final=True))
+    yield "".join(pending)
 
-        # Do work
-        with get_work_lock:
-            profiles[prof_no][day] = profiles[prof_no].get(day, 0) + 1
-            if section > 0:
-                ready_queue.append([prof_no, sec_no, section])
 
-    day = 1
+def parse_profile(line: str, line_no: int) -> List[int]:
+    """Parse a line of the uploaded file into a profile."""
+    profile = []
+    for match in re.finditer(r"\S+", line):
+        position = f"Line {line_no}, column {match.start() + 1}"
+        try:
+            initial = int(match.group())
+        except ValueError:
+            raise ValidationError(f"{position}: A segment must be a whole number")
+        if not 0 <= initial <= 30:
+            raise ValidationError(f"{position}: A segment must have initial value between 0 and 30")
+        if len(profile) == 2000:
+            raise ValidationError(f"{position}: A profile cannot have more than 2000 segments")
+        # Subtract the initial value from 30 to get the remaining height of the segment that must be build.
+        profile.append(30 - initial)
+    return profile
+
+
+def work_multi_thread(read_data: Iterable[List[int]], workers: int, literal: bool = False) -> None:
+    """Multi-threaded version of the work function."""
+    if literal:
+        with metrics.stage("simulate"):
+            data = multi_thread_days_literal(read_data, workers)
+        save_days(data)
+    else:
+        with metrics.stage("simulate"):
+            progress = multi_thread_progress(read_data, workers)
+        save_progress(progress)
+
+
+def multi_thread_days(read_data: Iterable[List[int]], workers: int) -> List[Day]:
+    """Build the day rows for the multi-threaded version."""
+    return list(progress_days(multi_thread_progress(read_data, workers)))
+
+
+def multi_thread_progress(read_data: Iterable[List[int]], workers: int) -> List[Progress]:
+    """Work out the progress of the profiles for the multi-threaded version without starting any threads.
+    On the first day the workers take the first sections of the work queue, one each, and only those
+    sections are built, each until it is done. Every day the sections still being built are handed
+    out again in order, so worker numbers are reassigned but the sections worked on are known upfront
+    and only the daily log has to be replayed.
+    """
+    sections = (
+        (prof_no, sec_no, section)
+        for prof_no, profile in enumerate(read_data, start=1)
+        for sec_no, section in enumerate(profile, start=1)
+    )
+    crews = list(islice(sections, max(workers, 0)))
+    has_work = bool(crews) or next(sections, None) is not None
+    # The sections nobody picks up are still read, so that the whole file is validated.
+    deque(sections, maxlen=0)
+
     log.info(f"Avaliable workers {workers}.")
-    while work_queue:
+    if has_work and log.isEnabledFor(logging.INFO):
+        log_multi_thread_days(crews, workers)
+
+    # A worker always does one foot on its first day, even on a section that is already done.
+    profiles = {}  # profiles = {profile: [remaining height of each section]}
+    for prof_no, sec_no, section in crews:
+        profiles.setdefault(prof_no, []).append(max(section, 1))
+
+    return [(prof_no, profile_daily_feet(profile)) for prof_no, profile in profiles.items()]
+
+
+def log_multi_thread_days(crews: List[Tuple[int, int, int]], workers: int) -> None:
+    """Write the daily log of the workers, the same way the threads of the literal simulation do."""
+    logged = logged_workers(workers)
+    day = 1
+    while True:
         log.info(f"Day: {day}")
-        pool = []
-        for worker_no in range(1, workers + 1):
-            t = threading.Thread(target=work, args=(worker_no, day), daemon=True)
-            t.start()
-            pool.append(t)
+        for worker_no in logged:
+            if worker_no <= len(crews):
+                prof_no, sec_no, section = crews[worker_no - 1]
+                log.info(f"Worker #{worker_no} works on Profile {prof_no}, Section {sec_no}")
+            else:
+                log.info(f"Worker #{worker_no} got no job today and is relieved")
+        if len(logged) < workers:
+            log_workers_summary(len(crews), workers)
+
+        crews = [crew for crew in crews if crew[2] > day]
+        if not crews:
+            break
+        day += 1
+
+
+def logged_workers(workers: int) -> range:
+    """The workers whose daily job is logged, according to THEWALL_WORKER_LOG."""
+    if settings.THEWALL_WORKER_LOG == "full":
+        return range(1, workers + 1)
+    if settings.THEWALL_WORKER_LOG == "sampled":
+        return range(1, workers + 1, settings.THEWALL_WORKER_LOG_SAMPLE)
+    if settings.THEWALL_WORKER_LOG == "summary":
+        return range(0)
+    raise ImproperlyConfigured("THEWALL_WORKER_LOG must be full, sampled or summary")
+
+
+def log_workers_summary(working: int, workers: int) -> None:
+    log.info(f"Workers working today: {working}, relieved: {workers - working}")
+
+
+def multi_thread_days_literal(read_data: Iterable[List[int]], workers: int) -> List[Day]:
+    """Literal simulation of the multi-threaded version.
+    Each worker is a thread that lives for the whole build. Every day the sections still being built
+    are handed out in order, the n-th to worker #n, so no two workers ever share a section and no lock
+    is needed: a worker only counts the feet it builds, and the counts are merged at the end.
+    The day is passed from worker to worker through their queues, which wakes up one thread at a time.
+    """
+    sections = [
+        [prof_no, sec_no, section]
+        for prof_no, profile in enumerate(read_data, start=1)
+        for sec_no, section in enumerate(profile, start=1)
+    ]
+    workers_feet = [Counter() for _ in range(max(workers, 0))]  # workers_feet = [{(profile, day): feet}]
+    logged = logged_workers(workers) if log.isEnabledFor(logging.INFO) else range(0)
+    inboxes = [queue.SimpleQueue() for _ in workers_feet]  # the days each worker is woken up for
+    done = queue.SimpleQueue()  # the days that are over
+    crews = sections[: len(workers_feet)]  # the sections being built today, in order
+    following = {}  # following = {worker: worker to wake up after it today}
+
+    def work(worker_no):
+        """Worker function, called once per worker."""
+        feet = workers_feet[worker_no - 1]
+        while (day := inboxes[worker_no - 1].get()) is not None:
+            if worker_no > len(crews):
+                log.info(f"Worker #{worker_no} got no job today and is relieved")
+            else:
+                crew = crews[worker_no - 1]
+                prof_no, sec_no, section = crew
+                if worker_no in logged:
+                    log.info(f"Worker #{worker_no} works on Profile {prof_no}, Section {sec_no}")
+                feet[prof_no, day] += 1
+                crew[2] = section - 1
+            next_worker = following.get(worker_no)
+            (done if next_worker is None else inboxes[next_worker - 1]).put(day)
+
+    pool = [threading.Thread(target=work, args=(worker_no,), daemon=True) for worker_no in range(1, workers + 1)]
+    log.info(f"Avaliable workers {workers}.")
+    for t in pool:
+        t.start()
+    try:
+        day = 1
+        while sections:
+            log.info(f"Day: {day}")
+            # Only the workers with a job today, or whose day off is logged, are woken up.
+            woken = list(range(1, len(crews) + 1))
+            woken.extend(worker_no for worker_no in logged if worker_no > len(crews))
+            if woken:
+                following = dict(zip(woken, woken[1:]))
+                inboxes[woken[0] - 1].put(day)
+                done.get()
+            if len(logged) < workers:
+                log_workers_summary(len(crews), workers)
+
+            # A worker always does one foot on its first day, even on a section that is already done.
+            crews = [crew for crew in crews if crew[2] > 0]
+            if not crews:
+                break
+            day += 1
+    finally:
+        for inbox in inboxes:
+            inbox.put(None)
         for t in pool:
             t.join()
 
-        work_queue = deque(ready_queue)
-        ready_queue = []
-        day += 1
+    feet = Counter()
+    for worker_feet in workers_feet:
+        feet.update(worker_feet)
+    profiles = {}  # profiles = {profile: {day: current_work}}
+    for (prof_no, day), current_work in sorted(feet.items()):
+        profiles.setdefault(prof_no, {})[day] = current_work
 
     data = []
     for prof_no in profiles:
@@ -101,18 +358,65 @@ def work_multi_thread(read_data: List[List[int]], workers: int) -> None:
                 total_feet_done=total_work,
             )
             data.append(d)
-    if data:
-        Day.objects.all().delete()
-        for d in data:
-            d.save()
+    return data
 
 
-def work_single_thread(read_data: List[List[int]]):
+def work_single_thread(read_data: Iterable[List[int]], literal: bool = False) -> None:
     """Single-threaded version of the work function."""
+    if literal:
+        with metrics.stage("simulate"):
+            data = single_thread_days_literal(read_data)
+        save_days(data)
+    else:
+        save_progress(metrics.iter_stage("simulate", single_thread_progress_parallel(read_data)))
+
+
+def single_thread_days(read_data: Iterable[List[int]]) -> Iterator[Day]:
+    """Build the day rows for the single-threaded version."""
+    return progress_days(single_thread_progress(read_data))
+
+
+def single_thread_progress(read_data: Iterable[List[int]]) -> Iterator[Progress]:
+    """Work out the progress of the profiles for the single-threaded version.
+    Each crew works until its section is done, so the feet done on a given day is the number
+    of sections whose remaining height is at least that day. It is counted from a histogram of
+    the remaining heights instead of walking all the sections every day.
+    """
+    for prof_no, profile in enumerate(read_data, start=1):
+        yield prof_no, profile_daily_feet(profile)
+
+
+def single_thread_progress_parallel(
+    read_data: Iterable[List[int]], processes: Optional[int] = None, chunk_size: Optional[int] = None
+) -> Iterator[Progress]:
+    """Work out the progress of the profiles for the single-threaded version on a pool of processes.
+    The profiles are independent, so they are sent to the processes `chunk_size` at a time and their
+    progress is yielded in profile order. With a single process they are worked out in this one.
+    """
+    if processes is None:
+        processes = settings.THEWALL_PROCESSES
+    if chunk_size is None:
+        chunk_size = settings.THEWALL_PROCESS_CHUNK_SIZE
+    if processes <= 1:
+        yield from single_thread_progress(read_data)
+        return
+
+    read_data = iter(read_data)
+    prof_no = 0
+    with ProcessPoolExecutor(processes) as executor:
+        # A few chunks per process are read at a time, so that the whole file is never held in memory.
+        while batch := list(islice(read_data, processes * chunk_size * 4)):
+            for daily_feet in executor.map(profile_daily_feet, batch, chunksize=chunk_size):
+                prof_no += 1
+                yield prof_no, daily_feet
+
+
+def single_thread_days_literal(read_data: Iterable[List[int]]) -> List[Day]:
+    """Day by day simulation of the single-threaded version, kept as a reference."""
     data = []
     for prof_no, profile in enumerate(read_data, start=1):
         total_work = 0  # section total
-        for day in range(1, max(profile) + 1):
+        for day in range(1, max(profile, default=0) + 1):
             current_work = 0  # daily work completed
             for section in profile:
                 if section >= day:
@@ -125,7 +429,226 @@ def work_single_thread(read_data: List[List[int]]):
                 total_feet_done=total_work,
             )
             data.append(d)
-    if data:
-        Day.objects.all().delete()
-        for d in data:
-            d.save()
+    return data
+
+
+def single_thread_progress_literal(read_data: Iterable[List[int]]) -> Iterator[Progress]:
+    """Work out the progress of the profiles with the day by day simulation of the single-threaded version.
+    Unlike its day rows, the profiles that are already completed are kept, with no progress.
+    """
+    for prof_no, profile in enumerate(read_data, start=1):
+        yield prof_no, [d.current_feet_done for d in single_thread_days_literal([profile])]
+
+
+def profile_days(prof_no: int, daily_feet: List[int], dataset: Optional[Dataset] = None) -> List[Day]:
+    """Build the day rows of a profile from the feet done on each day."""
+    data = []
+    total_work = 0
+    for day, current_work in enumerate(daily_feet, start=1):
+        total_work += current_work
+        data.append(
+            Day(
+                dataset=dataset,
+                day_no=day,
+                profile_no=prof_no,
+                current_feet_done=current_work,
+                total_feet_done=total_work,
+            )
+        )
+    return data
+
+
+def progress_days(progress: Iterable[Progress], dataset: Optional[Dataset] = None) -> Iterator[Day]:
+    """Build the day rows from the progress of the profiles."""
+    for prof_no, daily_feet in progress:
+        yield from profile_days(prof_no, daily_feet, dataset)
+
+
+def days_progress(data: Iterable[Day]) -> Iterator[Progress]:
+    """Work out the progress of the profiles from their day rows, ordered by profile and day."""
+    for prof_no, days in groupby(data, key=lambda d: d.profile_no):
+        yield prof_no, [d.current_feet_done for d in days]
+
+
+def save_days(data: Iterable[Day], batch_size: Optional[int] = None) -> None:
+    """Store the given days, ordered by profile and day, as the active dataset."""
+    save_progress(days_progress(data), batch_size)
+
+
+def save_progress(progress: Iterable[Progress], batch_size: Optional[int] = None, digest: Optional[str] = None) -> None:
+    """Store the given progress as a new dataset, and make it the active one once it is complete.
+    `digest` is the hash of the upload the progress comes from.
+    The feet done on each day are kept per profile, and as one row per profile and day unless
+    THEWALL_STORAGE is "compact". The totals of all the profiles are kept for each day.
+    The profiles are read and written batch by batch, the active dataset is kept if there is none.
+    """
+    if batch_size is None:
+        batch_size = settings.THEWALL_BULK_BATCH_SIZE
+    store_days = settings.THEWALL_STORAGE != "compact"
+
+    # Profiles that are already completed have no progress.
+    progress = (item for item in progress if item[1])
+    first = next(progress, None)
+    if first is None:
+        return
+
+    start = time.perf_counter()
+    rows = 0
+    total_feet = defaultdict(int)  # total_feet = {day: current_work of all the profiles}
+    with transaction.atomic():
+        dataset = Dataset.objects.create(digest=digest)
+        progress = chain([first], progress)
+        while batch := list(islice(progress, batch_size)):
+            rows += insert_progress(batch, dataset, store_days, batch_size, total_feet)
+
+        with metrics.stage("totals"):
+            DayTotal.objects.bulk_create(day_totals(total_feet, dataset), batch_size=batch_size)
+    metrics.count("rows_inserted", rows)
+    with metrics.stage("activate"):
+        activate_dataset(dataset)
+    elapsed = time.perf_counter() - start
+    log.info(f"Saved {rows} rows in {elapsed:.3f}s ({rows / elapsed:.0f} rows/s)")
+
+    with metrics.stage("delete"):
+        delete_old_datasets(dataset)
+
+
+def insert_progress(
+    batch: List[Progress], dataset: Dataset, store_days: bool, batch_size: int, feet: Dict[int, int]
+) -> int:
+    """Insert the progress of a batch of profiles into the dataset, with their day rows if `store_days`,
+    and add the feet done by them on each day to `feet`. Return the number of rows inserted.
+    """
+    with metrics.stage("insert"):
+        ProfileProgress.objects.bulk_create(
+            ProfileProgress(dataset=dataset, profile_no=prof_no, daily_feet=daily_feet) for prof_no, daily_feet in batch
+        )
+    rows = len(batch)
+    if store_days:
+        with metrics.stage("rows"):
+            days = list(progress_days(batch, dataset))
+        with metrics.stage("insert"):
+            Day.objects.bulk_create(days, batch_size=batch_size)
+        rows += len(days)
+    with metrics.stage("totals"):
+        for prof_no, daily_feet in batch:
+            for day, current_work in enumerate(daily_feet, start=1):
+                feet[day] += current_work
+    return rows
+
+
+def activate_dataset(dataset: Dataset) -> None:
+    """Make the given dataset the one shown, the readers switch to it all at once."""
+    with transaction.atomic():
+        ActiveDataset.objects.get_or_create(pk=ACTIVE_DATASET)
+        bump_revision(dataset=dataset)
+
+
+def bump_revision(**changes) -> None:
+    """Bump the revision of the active data with the given changes of the pointer, in the same transaction
+    as the changes of the data, so the cached responses and the ETags of the old data are not used anymore.
+    """
+    ActiveDataset.objects.filter(pk=ACTIVE_DATASET).update(revision=F("revision") + 1, **changes)
+
+
+def delete_old_datasets(dataset: Dataset) -> None:
+    """Delete the datasets older than the given one but the THEWALL_DATASETS_KEPT most recent ones.
+    The active dataset is always kept, and so are the newer datasets that may still be being written.
+    """
+    active = ActiveDataset.objects.filter(pk=ACTIVE_DATASET).values("dataset_id")
+    old = Dataset.objects.filter(pk__lt=dataset.pk).exclude(pk__in=active).order_by("-pk")
+    old_ids = list(old.values_list("pk", flat=True)[settings.THEWALL_DATASETS_KEPT :])
+    if old_ids:
+        deleted, _ = Dataset.objects.filter(pk__in=old_ids).delete()
+        metrics.count("rows_deleted", deleted)
+
+
+def renumber_progress(
+    progress: Iterable[Progress], offset: int = 0, profile_numbers: Optional[List[int]] = None
+) -> Iterator[Progress]:
+    """Number the profiles of an upload after `offset`, or with the given `profile_numbers`."""
+    if offset < 0:
+        raise ValidationError("The profile offset cannot be negative")
+    if profile_numbers is not None:
+        if any(prof_no < 1 for prof_no in profile_numbers):
+            raise ValidationError("A profile number must be positive")
+        if len(set(profile_numbers)) < len(profile_numbers):
+            raise ValidationError("A profile number cannot be given more than once")
+
+    # The profiles are numbered by their line in the file, not by their position in the progress.
+    last = 0
+    for prof_no, daily_feet in progress:
+        last = prof_no
+        if profile_numbers is None:
+            yield offset + prof_no, daily_feet
+        elif prof_no <= len(profile_numbers):
+            yield profile_numbers[prof_no - 1], daily_feet
+        else:
+            raise ValidationError("The file has more profiles than profile numbers given")
+    if profile_numbers is not None and last < len(profile_numbers):
+        raise ValidationError("The file has fewer profiles than profile numbers given")
+
+
+def update_progress(progress: Iterable[Progress], batch_size: Optional[int] = None) -> None:
+    """Replace the progress of the given profiles in the active dataset in a single transaction, keeping the
+    other profiles. The totals of all the profiles are updated with the difference.
+    The active dataset cannot be switched meanwhile, a new one is made active if there is none.
+    """
+    if batch_size is None:
+        batch_size = settings.THEWALL_BULK_BATCH_SIZE
+    store_days = settings.THEWALL_STORAGE != "compact"
+
+    start = time.perf_counter()
+    rows = 0
+    changed_feet = defaultdict(int)  # changed_feet = {day: change of the current_work of all the profiles}
+    with transaction.atomic():
+        active, _ = ActiveDataset.objects.select_for_update().get_or_create(pk=ACTIVE_DATASET)
+        if active.dataset is None:
+            active.dataset = Dataset.objects.create()
+            active.save()
+        else:
+            # The dataset does not come from a single file anymore.
+            active.dataset.digest = None
+            active.dataset.save(update_fields=["digest"])
+        dataset = active.dataset
+
+        progress = iter(progress)
+        while batch := list(islice(progress, batch_size)):
+            profile_numbers = [prof_no for prof_no, daily_feet in batch]
+            with metrics.stage("delete"):
+                stored = ProfileProgress.objects.filter(dataset=dataset, profile_no__in=profile_numbers)
+                for daily_feet in stored.values_list("daily_feet", flat=True):
+                    for day, current_work in enumerate(daily_feet, start=1):
+                        changed_feet[day] -= current_work
+                stored.delete()
+                deleted, _ = Day.objects.filter(dataset=dataset, profile_no__in=profile_numbers).delete()
+            metrics.count("rows_deleted", deleted)
+
+            # Profiles that are already completed have no progress.
+            batch = [item for item in batch if item[1]]
+            rows += insert_progress(batch, dataset, store_days, batch_size, changed_feet)
+
+        with metrics.stage("totals"):
+            totals = DayTotal.objects.filter(dataset=dataset)
+            total_feet = {d.day_no: d.current_feet_done + changed_feet.get(d.day_no, 0) for d in totals}
+            for day, current_work in changed_feet.items():
+                total_feet.setdefault(day, current_work)
+            total_feet = {day: current_work for day, current_work in total_feet.items() if current_work}
+            totals.delete()
+            if total_feet:
+                DayTotal.objects.bulk_create(day_totals(total_feet, dataset), batch_size=batch_size)
+        bump_revision()
+    metrics.count("rows_inserted", rows)
+    elapsed = time.perf_counter() - start
+    log.info(f"Updated {rows} rows in {elapsed:.3f}s ({rows / elapsed:.0f} rows/s)")
+
+
+def day_totals(daily_feet: Dict[int, int], dataset: Optional[Dataset] = None) -> List[DayTotal]:
+    """Build the total rows from the feet done on each day by all the profiles."""
+    data = []
+    total_work = 0
+    for day in range(1, max(daily_feet) + 1):
+        current_work = daily_feet.get(day, 0)
+        total_work += current_work
+        data.append(DayTotal(dataset=dataset, day_no=day, current_feet_done=current_work, total_feet_done=total_work))
+    return data
@@ -1,17 +1,29 @@
 from django.urls import path, reverse_lazy
 from django.views.generic import RedirectView
 from rest_framework.urlpatterns import format_suffix_patterns
-from thewall import views
+from thewall import async_views, views
 
 redirect_view = RedirectView.as_view(url=reverse_lazy("profiles"))
 profiles_views = views.ProfilesViewSet.as_view({"get": "list"})
 upload_view = views.UploadViewSet.as_view({"get": "list", "post": "create"})
+upload_job_view = views.UploadViewSet.as_view({"get": "retrieve"})
+batch_view = views.BatchViewSet.as_view({"get": "list", "post": "create"})
+datasets_view = views.DatasetViewSet.as_view({"get": "list"})
+dataset_activate_view = views.DatasetViewSet.as_view({"post": "activate"})
+sweep_view = views.SweepViewSet.as_view({"get": "list", "post": "create"})
 
 urlpatterns = [
     path("", redirect_view, name="redirect_profiles"),
     path("profiles/", profiles_views, name="profiles"),
     path("profiles/raw/", views.DayView.as_view(), name="raw"),
+    path("profiles/raw/stream/", views.DayExportView.as_view(), name="raw_stream"),
+    path("profiles/export/<str:export_format>/", views.DayExportView.as_view(), name="export"),
     path("profiles/upload/", upload_view, name="upload"),
+    path("profiles/upload/<str:job_id>/", upload_job_view, name="upload_job"),
+    path("profiles/batch/", batch_view, name="batch"),
+    path("profiles/sweep/", sweep_view, name="sweep"),
+    path("profiles/datasets/", datasets_view, name="datasets"),
+    path("profiles/datasets/<int:dataset_id>/activate/", dataset_activate_view, name="dataset_activate"),
     path("profiles/overview/", views.CostProfile.as_view()),
     path("profiles/overview/<int:day_id>/", views.CostProfile.as_view()),
     path(
@@ -19,6 +31,18 @@ urlpatterns = [
         views.CostProfileDay.as_view(),
     ),
     path("profiles/<int:profile_id>/days/<int:day_id>/", views.IceProfileDay.as_view()),
+    path("profiles/<int:profile_id>/series/", views.SeriesProfile.as_view()),
+    path("profiles/completion/", views.CompletionProfile.as_view()),
+    path("profiles/<int:profile_id>/completion/", views.CompletionProfile.as_view()),
+    path("profiles/<int:profile_id>/forecast/<int:day_id>/", views.ForecastProfileDay.as_view()),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
+urlpatterns += [
+    path("metrics/", views.metrics, name="metrics"),
+    # The ice and cost endpoints as async views, for ASGI deployments.
+    path("async/profiles/overview/", async_views.cost_profile),
+    path("async/profiles/overview/<int:day_id>/", async_views.cost_profile),
+    path("async/profiles/<int:profile_id>/overview/<int:day_id>/", async_views.cost_profile_day),
+    path("async/profiles/<int:profile_id>/days/<int:day_id>/", async_views.ice_profile_day),
+]
@@ -1,16 +1,34 @@
 import logging
+from typing import Optional
 
-from django.db.models import Max, Q
+from django.conf import settings
 from django.forms import ValidationError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.serializers import Serializer
 from rest_framework.viewsets import ViewSet
 
-from .models import Day
-from .serializers import CostSerializer, DaySerializer, IceSerializer, UploadSerializer
-from .upload import handle_upload_data  # Function to handle an uploaded file.
+from .caching import cache_response
+from .export import EXPORT_FORMATS, export_days
+from .jobs import get_job, submit_upload  # Functions to handle an uploaded file in the background.
+from .metrics import prometheus_text
+from .models import ACTIVE_DATASET, ActiveDataset, Dataset, Day
+from .pagination import DayKeysetPagination
+from .queries import (
+    dataset_lookup,
+    get_completion,
+    get_daily_feet,
+    get_day,
+    get_day_total,
+    get_days,
+    get_series,
+)
+from .serializers import DaySerializer, UploadSerializer
+from .sweep import crew_sweep, parse_crew_counts
+from .upload import activate_dataset, handle_upload_data, iter_profiles  # Function to handle an uploaded file.
 
 YARDS_ICE_PER_FOOT = 195
 GOLD_PER_YARD_ICE = 1900
@@ -51,9 +69,27 @@ class UploadViewSet(ViewSet):
             return Response(response, return_status)
 
         workers = int(request.data.get("workers", -1))
+        options = {"literal": request.data.get("mode") == "literal"}
 
+        # Only the profiles of the file are replaced when they are numbered with an offset or explicitly.
         try:
-            handle_upload_data(uploaded_file, workers)
+            if "offset" in request.data:
+                options["offset"] = int(request.data["offset"])
+            if "profiles" in request.data:
+                options["profile_numbers"] = [int(prof_no) for prof_no in request.data["profiles"].split(",")]
+        except ValueError:
+            response = "File upload failed: Profile numbers must be whole numbers!"
+            return_status = status.HTTP_400_BAD_REQUEST
+            return Response(response, return_status)
+
+        if str(request.data.get("async", "")).lower() in ("1", "true"):
+            job = submit_upload(uploaded_file, workers, **options)
+            response = {"id": job.id, "url": reverse("upload_job", args=[job.id], request=request)}
+            return Response(response, status.HTTP_202_ACCEPTED)
+
+        upload_metrics = None
+        try:
+            upload_metrics = handle_upload_data(uploaded_file, workers, **options)
             response = "File upload successful!"
             return_status = status.HTTP_200_OK
         except ValidationError as ve:
@@ -64,61 +100,221 @@ class UploadViewSet(ViewSet):
             return_status = status.HTTP_400_BAD_REQUEST
             log.error(f"{response} {e}")
         finally:
-            return Response(response, return_status)
+            response = Response(response, return_status)
+            if upload_metrics is not None:
+                response["Server-Timing"] = upload_metrics.server_timing()
+            return response
+
+    def retrieve(self, request, job_id, format=None):
+        job = get_job(job_id)
+        if job is None:
+            return Response("Upload job not found!", status.HTTP_404_NOT_FOUND)
+        return Response(job.as_dict())
+
+
+class SweepViewSet(ViewSet):
+    serializer_class = UploadSerializer
+
+    def list(self, request, format=None):
+        return Response(
+            'Use POST request with a data file and the crew counts, e.g. "workers": "1-10,20,100-1000:100", '
+            + "to get the completion day and the cost of the multi-threaded version for each count"
+        )
+
+    def create(self, request, format=None):
+        try:
+            uploaded_file = request.FILES["file_uploaded"]
+        except KeyError:
+            return Response("Sweep failed: No file uploaded!", status.HTTP_400_BAD_REQUEST)
+
+        # Nothing is stored, the file is read once for all the crew counts.
+        try:
+            crew_counts = parse_crew_counts(str(request.data.get("workers", "")))
+            sweep = crew_sweep(iter_profiles(uploaded_file), crew_counts)
+        except ValidationError as ve:
+            return Response(f"Sweep failed: {ve.message}", status.HTTP_400_BAD_REQUEST)
+        return Response(
+            [
+                {
+                    "workers": workers,
+                    "day": day_no,
+                    "ice_amount": feet * YARDS_ICE_PER_FOOT,
+                    "cost": feet * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE,
+                }
+                for workers, day_no, feet in sweep
+            ]
+        )
+
+
+def get_dataset_id(request) -> Optional[int]:
+    """Return the dataset asked for with ?dataset=, None for the active one."""
+    dataset_id = request.GET.get("dataset")
+    if dataset_id is None:
+        return None
+    try:
+        return int(dataset_id)
+    except ValueError:
+        raise Http404
+
+
+class DatasetViewSet(ViewSet):
+    def list(self, request, format=None):
+        active_id = ActiveDataset.objects.filter(pk=ACTIVE_DATASET).values_list("dataset_id", flat=True).first()
+        datasets = Dataset.objects.order_by("-id").values("id", "digest", "created")
+        return Response([{**dataset, "active": dataset["id"] == active_id} for dataset in datasets])
+
+    def activate(self, request, dataset_id, format=None):
+        # Rolling back to an earlier upload is switching back to its dataset.
+        dataset = get_object_or_404(Dataset, pk=dataset_id)
+        activate_dataset(dataset)
+        return Response(f"Dataset {dataset.pk} is active!")
 
 
 class DayView(generics.ListAPIView):
-    queryset = Day.objects.all()
     serializer_class = DaySerializer
+    pagination_class = DayKeysetPagination
+
+    def get_queryset(self):
+        return Day.objects.filter(dataset=dataset_lookup(get_dataset_id(self.request)))
+
+    @cache_response
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class DayExportView(generics.GenericAPIView):
+    def get(self, request, export_format="json", format=None):
+        if export_format not in EXPORT_FORMATS:
+            raise Http404
+        content_type = EXPORT_FORMATS[export_format][2]
+
+        # The days are read and sent a chunk at a time, so the memory used does not depend on their number.
+        chunks = export_days(export_format, dataset_id=get_dataset_id(request))
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="days.{export_format}"'
+        return response
 
 
 class IceProfileDay(generics.ListAPIView):
+    @cache_response
     def get(self, request, day_id, profile_id, format=None):
-        queryset = Day.objects.filter(day_no=day_id, profile_no=profile_id)
-        item = get_object_or_404(queryset)
-
-        serializer = IceSerializer(
-            data={
-                "day": item.day_no,
-                "ice_amount": item.current_feet_done * YARDS_ICE_PER_FOOT,
-            }
-        )
-        if serializer.is_valid():
-            return Response(serializer.data)
+        current_feet_done, total_feet_done = get_day(profile_id, day_id, get_dataset_id(request))
+        # The values come from the database, they are sent as they are.
+        return Response({"day": day_id, "ice_amount": current_feet_done * YARDS_ICE_PER_FOOT})
 
 
 class CostProfileDay(generics.ListAPIView):
+    @cache_response
     def get(self, request, day_id, profile_id, format=None):
-        queryset = Day.objects.filter(day_no=day_id, profile_no=profile_id)
-        item = get_object_or_404(queryset)
+        current_feet_done, total_feet_done = get_day(profile_id, day_id, get_dataset_id(request))
+        return Response({"day": day_id, "cost": total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE})
 
-        serializer = CostSerializer(
-            data={
-                "day": item.day_no,
-                "cost": (item.total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE),
+
+class SeriesProfile(generics.ListAPIView):
+    @cache_response
+    def get(self, request, profile_id, format=None):
+        try:
+            first_day = int(request.query_params.get("from", 1))
+            last_day = int(request.query_params["to"]) if "to" in request.query_params else None
+        except ValueError:
+            return Response("The from and to days must be whole numbers!", status.HTTP_400_BAD_REQUEST)
+
+        series = get_series(profile_id, first_day, last_day, get_dataset_id(request))
+        return Response(
+            {
+                "day": [day_no for day_no, current_feet_done, total_feet_done in series],
+                "ice_amount": [current_feet_done * YARDS_ICE_PER_FOOT for _, current_feet_done, _ in series],
+                "cost": [total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE for _, _, total_feet_done in series],
             }
         )
-        if serializer.is_valid():
-            return Response(serializer.data)
 
 
 class CostProfile(generics.ListAPIView):
+    @cache_response
     def get(self, request, day_id=None, format=None):
-        total_feet_done = 0
-        profile_count = Day.objects.aggregate(Max("profile_no"))["profile_no__max"]
-        for profile_no in range(1, profile_count + 1):
-            if not day_id:
-                result = Day.objects.aggregate(day_max=Max("day_no", filter=Q(profile_no=profile_no)))
-                day_max = result.get("day_max")
-            queryset = Day.objects.filter(day_no=day_id if day_id else day_max, profile_no=profile_no)
-            item = get_object_or_404(queryset)
-            total_feet_done += item.total_feet_done
-
-        serializer = CostSerializer(
-            data={
+        total_feet_done = get_day_total(day_id or None, get_dataset_id(request))
+        return Response({"day": day_id, "cost": total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE})
+
+
+class CompletionProfile(generics.ListAPIView):
+    """The day a profile, or the whole wall, is completed, with the ice used and its cost by then.
+    They are worked out from the progress of the profile, no day rows are read.
+    """
+
+    @cache_response
+    def get(self, request, profile_id=None, format=None):
+        if profile_id is None:
+            day_no, total_feet_done = get_completion(get_dataset_id(request))
+        else:
+            daily_feet = get_daily_feet(profile_id, get_dataset_id(request))
+            day_no, total_feet_done = len(daily_feet), sum(daily_feet)
+        return Response(
+            {
+                "day": day_no,
+                "ice_amount": total_feet_done * YARDS_ICE_PER_FOOT,
+                "cost": total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE,
+            }
+        )
+
+
+class ForecastProfileDay(generics.ListAPIView):
+    """The ice used by a profile on any day and its cost up to that day, even after the profile is completed.
+    They are worked out from the progress of the profile, no day rows are read.
+    """
+
+    @cache_response
+    def get(self, request, day_id, profile_id, format=None):
+        if day_id < 1:
+            raise Http404
+        daily_feet = get_daily_feet(profile_id, get_dataset_id(request))
+        current_feet_done = daily_feet[day_id - 1] if day_id <= len(daily_feet) else 0
+        total_feet_done = sum(daily_feet[:day_id])
+        return Response(
+            {
                 "day": day_id,
-                "cost": (total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE),
+                "ice_amount": current_feet_done * YARDS_ICE_PER_FOOT,
+                "cost": total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE,
+                "completed": day_id >= len(daily_feet),
             }
         )
-        if serializer.is_valid():
-            return Response(serializer.data)
+
+
+class BatchViewSet(ViewSet):
+    def list(self, request, format=None):
+        return Response(
+            'Use POST request with {"queries": [[profile_no, day_no, "ice" or "cost"], ...]} '
+            + "to get the amount of ice or the cost for many profiles and days at once"
+        )
+
+    def create(self, request, format=None):
+        queries = request.data.get("queries") if isinstance(request.data, dict) else None
+        if not isinstance(queries, list) or len(queries) > settings.THEWALL_BATCH_MAX_QUERIES:
+            response = f"Batch query failed: Expected a list of at most {settings.THEWALL_BATCH_MAX_QUERIES} queries!"
+            return Response(response, status.HTTP_400_BAD_REQUEST)
+        for query in queries:
+            if (
+                not isinstance(query, list)
+                or len(query) != 3
+                or not all(isinstance(number, int) for number in query[:2])
+                or query[2] not in ("ice", "cost")
+            ):
+                response = f'Batch query failed: {query} is not a [profile_no, day_no, "ice" or "cost"] query!'
+                return Response(response, status.HTTP_400_BAD_REQUEST)
+
+        # Queries for a profile that was not worked on a day are answered with null.
+        days = get_days(((profile_no, day_no) for profile_no, day_no, metric in queries), get_dataset_id(request))
+        results = []
+        for profile_no, day_no, metric in queries:
+            current_feet_done, total_feet_done = days.get((profile_no, day_no), (None, None))
+            if current_feet_done is None:
+                results.append(None)
+            elif metric == "ice":
+                results.append(current_feet_done * YARDS_ICE_PER_FOOT)
+            else:
+                results.append(total_feet_done * YARDS_ICE_PER_FOOT * GOLD_PER_YARD_ICE)
+        return Response(results)
+
+
+def metrics(request):
+    """Totals of the uploads handled by this process, in the Prometheus text format."""
+    return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")